@@ -0,0 +1,213 @@
+# apps/admin_api/analytics.py
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from apps.raw.models import Transaction
+from apps.admin_api.models import Product, ProductDailySales, ProductRanking, TransactionDailyStats
+from apps.admin_api.counters import with_sales
+
+CENT = Decimal('0.01')
+RANKING_SIZE = 100  # products kept per ranking window
+RANKING_WINDOWS = {'7d': 7, '30d': 30, 'all': None}
+
+# Portable upsert (PostgreSQL, SQLite >= 3.24) into today's stats slots. The conflict target
+# names the partial unique constraint matching the rows' category (see TransactionDailyStats).
+RECORD_POSTINGS_SQL = """
+INSERT INTO {stats} (day, transaction_type, status, category_id, slot, total, count)
+VALUES {values}
+ON CONFLICT (day, transaction_type, status, {key}slot) WHERE category_id IS {nullness}
+DO UPDATE SET total = {stats}.total + excluded.total, count = {stats}.count + excluded.count
+"""
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def record_postings(postings):
+    """
+    Adds postings to today's TransactionDailyStats, inside the caller's transaction, so the stats
+    change exactly when the postings commit.
+    - postings: iterable of (transaction_type, status, category_id, count, total).
+    - One upsert per category kind into a random slot of each group; groups are written in key
+      order, so two transactions recording the same groups lock them in the same order.
+    """
+    groups = {}
+    for transaction_type, status, category_id, count, total in postings:
+        key = (transaction_type, status, category_id)
+        previous_count, previous_total = groups.get(key, (0, Decimal('0.00')))
+        groups[key] = (previous_count + count, previous_total + total)
+    if not groups:
+        return
+    day = connection.ops.adapt_datefield_value(timezone.localdate())
+    slot = random.randrange(settings.DAILY_STATS_SHARDS)
+    stats = connection.ops.quote_name(TransactionDailyStats._meta.db_table)
+    ordered = sorted(groups.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or 0))
+    with connection.cursor() as cursor:
+        for categorized in (False, True):
+            rows = [(key, value) for key, value in ordered if (key[2] is not None) == categorized]
+            if not rows:
+                continue
+            sql = RECORD_POSTINGS_SQL.format(
+                stats=stats,
+                values=', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(rows)),
+                key='category_id, ' if categorized else '',
+                nullness='NOT NULL' if categorized else 'NULL',
+            )
+            params = []
+            for (transaction_type, status, category_id), (count, total) in rows:
+                params += [
+                    day, transaction_type, status, category_id, slot,
+                    connection.ops.adapt_decimalfield_value(Decimal(total).quantize(CENT)), count,
+                ]
+            cursor.execute(sql, params)
+
+
+def refresh_daily_stats(start, end):
+    """
+    Rebuilds the TransactionDailyStats rows for every day in [start, end] from the ledger, for
+    backfill and repair; postings keep today's rows current themselves (record_postings).
+    - One grouped query over the range; shop redemptions are keyed by their product's category.
+    - Days are replaced wholesale, so re-running is idempotent.
+    - Postings recording meanwhile wait for the rebuild to commit, then add to the rebuilt rows.
+    Returns the number of rollup rows written.
+    """
+    product_category = Product.objects.filter(id=OuterRef('product_id')).values('category_id')
+    groups = Transaction.objects.filter(
+        created_at__gte=_day_start(start),
+        created_at__lt=_day_start(end + timedelta(days=1)),
+    ).annotate(
+        day=TruncDate('created_at'),
+        category_id=Subquery(product_category),
+    ).order_by().values('day', 'transaction_type', 'status', 'category_id').annotate(
+        total=Sum('amount'),
+        count=Count('id'),
+    )
+    with transaction.atomic():
+        # Block record_postings until commit (PostgreSQL: the upsert's ROW EXCLUSIVE lock
+        # conflicts with EXCLUSIVE, which still lets dashboards read; SQLite: the DELETE takes
+        # the database write lock), then read the ledger: every posting is either in the
+        # snapshot or recorded on top of the rebuilt rows, never both or neither
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {connection.ops.quote_name(TransactionDailyStats._meta.db_table)} IN EXCLUSIVE MODE")
+        TransactionDailyStats.objects.filter(day__gte=start, day__lte=end).delete()
+        rows = [
+            TransactionDailyStats(
+                day=group['day'],
+                transaction_type=group['transaction_type'],
+                status=group['status'],
+                category_id=group['category_id'],
+                # SQLite sums decimals as floats; store at the ledger's precision
+                total=Decimal(str(group['total'] or 0)).quantize(CENT),
+                count=group['count'],
+            )
+            for group in groups
+        ]
+        TransactionDailyStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def refresh_product_sales(start, end):
+    """
+    Rebuilds the ProductDailySales rows for every day in [start, end] from completed shop redemptions.
+    Returns the number of rows written.
+    """
+    groups = Transaction.objects.filter(
+        created_at__gte=_day_start(start),
+        created_at__lt=_day_start(end + timedelta(days=1)),
+        transaction_type='SHOP_REDEMPTION',
+        status='COMPLETED',
+    ).filter(
+        Exists(Product.objects.filter(id=OuterRef('product_id')))
+    ).annotate(day=TruncDate('created_at')).order_by().values('day', 'product_id').annotate(
+        sales=Count('id'),
+        coins=Sum('amount'),
+    )
+    rows = [
+        ProductDailySales(
+            product_id=group['product_id'],
+            day=group['day'],
+            sales=group['sales'],
+            coins=Decimal(str(group['coins'] or 0)).quantize(CENT),
+        )
+        for group in groups
+    ]
+    with transaction.atomic():
+        ProductDailySales.objects.filter(day__gte=start, day__lte=end).delete()
+        ProductDailySales.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _all_time_ranking():
+    """
+    Top RANKING_SIZE products by their live sales counter (Product.sales plus the unflushed shards),
+    so the all-time window never re-reads the sales history; ties are broken by product id.
+    - Coins are summed from ProductDailySales for the ranked products only.
+    """
+    top = list(
+        with_sales(Product.objects.all()).filter(live_sales__gt=0)
+        .order_by('-live_sales', 'id').values('id', 'live_sales')[:RANKING_SIZE]
+    )
+    coins = dict(
+        ProductDailySales.objects.filter(product_id__in=[product['id'] for product in top])
+        .values('product_id').annotate(total=Sum('coins')).values_list('product_id', 'total')
+    )
+    return [
+        {'product_id': product['id'], 'window_sales': product['live_sales'], 'window_coins': coins.get(product['id'])}
+        for product in top
+    ]
+
+
+def refresh_product_rankings(today=None):
+    """
+    Rebuilds the top RANKING_SIZE products of every window in RANKING_WINDOWS.
+    - Dated windows are ranked from ProductDailySales; they end today and include it, and ties are
+      broken by coins spent, then product id.
+    - The all-time window is ranked from the sales counters (see _all_time_ranking).
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    rows = []
+    for window, days in RANKING_WINDOWS.items():
+        if days is None:
+            ranked = _all_time_ranking()
+        else:
+            ranked = ProductDailySales.objects.filter(
+                day__gt=today - timedelta(days=days), day__lte=today,
+            ).values('product_id').annotate(
+                window_sales=Sum('sales'),
+                window_coins=Sum('coins'),
+            ).order_by('-window_sales', '-window_coins', 'product_id')[:RANKING_SIZE]
+        rows.extend(
+            ProductRanking(
+                window=window,
+                rank=rank,
+                product_id=entry['product_id'],
+                sales=entry['window_sales'],
+                coins=Decimal(str(entry['window_coins'] or 0)).quantize(CENT),
+                refreshed_at=now,
+            )
+            for rank, entry in enumerate(ranked, start=1)
+        )
+    with transaction.atomic():
+        ProductRanking.objects.all().delete()
+        ProductRanking.objects.bulk_create(rows)
+    return len(rows)
+
+
+def daily_stats(start=None, end=None, **filters):
+    """
+    TransactionDailyStats queryset for an optional inclusive day range, plus field filters.
+    """
+    stats = TransactionDailyStats.objects.filter(**filters)
+    if start:
+        stats = stats.filter(day__gte=start)
+    if end:
+        stats = stats.filter(day__lte=end)
+    return stats
@@ -6,10 +6,12 @@ class AdminApiConfig(AppConfig):
     """
     Configuration for the admin_api app.
     - Ensures signals are imported and connected when the app is ready.
+    - Registers the app's system checks (apps/admin_api/checks.py).
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.admin_api'
 
     def ready(self):
         # Import signals module to connect signal handlers
-        import_module('apps.admin_api.signals')
\ No newline at end of file
+        import_module('apps.admin_api.signals')
+        import_module('apps.admin_api.checks')
\ No newline at end of file
@@ -0,0 +1,95 @@
+# apps/admin_api/caching.py
+"""
+Versioned response cache for read-mostly admin endpoints, on Django's cache framework.
+- Each cached family of data has a "generation" counter stored in the cache.
+- Cache keys embed the current generation, so bumping it makes every older entry unreachable;
+  nothing is ever deleted or scanned, and stale entries simply age out.
+- Generations must live in a cache shared by every worker (deploy check admin_api.E001). With
+  the per-process default (development, tests) they expire after LOCAL_GENERATION_TIMEOUT seconds, so a
+  worker that missed a bump serves stale data for at most that long.
+- Generations are bumped after commit by the signal handlers in apps/admin_api/signals.py, and
+  by the rollup_transactions command for views that read the tables it rebuilds.
+"""
+import functools
+import hashlib
+import time
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+LEDGER = 'ledger'  # bumped by every posting; views reading the ledger, wallets or TransactionDailyStats
+ROLLUP = 'rollup'  # bumped by the rollup job (ProductDailySales, ProductRanking)
+CATALOG = 'catalog'  # bumped by every Product / Category change
+
+CACHE_HEADER = 'X-Cache'
+
+
+def _generation_key(name):
+    return f'generation:{name}'
+
+
+def _generation_timeout():
+    return settings.LOCAL_GENERATION_TIMEOUT if isinstance(caches['default'], LocMemCache) else None
+
+
+def generation(name):
+    """
+    Current value of a generation counter.
+    - A missing counter (first use, cache flush, eviction) restarts from the clock, never from a
+      value an older entry could still be keyed on.
+    """
+    key = _generation_key(name)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time_ns(), timeout=_generation_timeout())
+        value = cache.get(key)
+    return value
+
+
+def bump_generation(name):
+    key = _generation_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=_generation_timeout())
+
+
+def bump_generation_on_commit(name):
+    """
+    Bump once the surrounding transaction commits (immediately in autocommit mode), so a
+    concurrent read cannot cache pre-commit data under the new generation.
+    """
+    transaction.on_commit(lambda: bump_generation(name))
+
+
+def cached_response(*generations, timeout=None):
+    """
+    Decorator for a view's get(): serve the response body from the cache while the named
+    generations are unchanged.
+    - The key covers the view, the query parameters and today's date (for views whose default
+      period is "this month" or "this year").
+    - Only 200 responses are stored; hits carry an X-Cache: HIT header.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            params = urlencode(sorted(request.query_params.lists()), doseq=True)
+            versions = ':'.join(str(generation(name)) for name in generations)
+            digest = hashlib.sha256(f'{params}|{sorted(kwargs.items())}'.encode()).hexdigest()
+            key = f'response:{type(view).__name__}:{versions}:{timezone.localdate()}:{digest}'
+
+            data = cache.get(key)
+            if data is not None:
+                return Response(data, headers={CACHE_HEADER: 'HIT'})
+
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, settings.ANALYTICS_CACHE_TIMEOUT if timeout is None else timeout)
+                response[CACHE_HEADER] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,22 @@
+# apps/admin_api/checks.py
+"""
+System checks for the admin_api app.
+- The catalog and analytics generations (apps/admin_api/caching.py) must be shared by every worker
+  process; a per-process cache would let each worker keep serving its own version.
+- It is a deployment check (manage.py check --deploy), so tests and local runs keep the default cache.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if not isinstance(caches['default'], LocMemCache):
+        return []
+    return [Error(
+        "The default cache is per-process (locmemcache), so a catalog change made in one worker "
+        "is not seen by the others.",
+        hint="Set CACHE_URL to a shared backend (redis, memcached or dbcache).",
+        id='admin_api.E001',
+    )]
@@ -0,0 +1,81 @@
+# apps/admin_api/counters.py
+"""
+Sharded product sales counters.
+- record_sale adds to one of PRODUCT_SALES_SHARDS ProductSalesShard rows picked at random, in a
+  single upsert, so a popular product's purchases are spread over many rows instead of queueing
+  on the product row.
+- The live count is Product.sales plus the product's shards (with_sales / product_sales).
+- flush_sales periodically folds the shards into Product.sales (run by rollup_transactions).
+"""
+import random
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from apps.admin_api.models import Product, ProductSalesShard
+
+# Portable upsert (PostgreSQL, SQLite >= 3.24); selecting from the product table makes a sale of a
+# product deleted meanwhile a no-op instead of a foreign key error at commit.
+RECORD_SALE_SQL = """
+INSERT INTO {shard} (product_id, slot, count)
+SELECT id, %s, %s FROM {product} WHERE id = %s
+ON CONFLICT (product_id, slot) DO UPDATE SET count = {shard}.count + excluded.count
+"""
+
+
+def record_sale(product_id, count=1):
+    """
+    Count count purchases of a product. Runs inside the caller's transaction, so the sale is
+    counted only if the purchase commits.
+    """
+    sql = RECORD_SALE_SQL.format(
+        shard=connection.ops.quote_name(ProductSalesShard._meta.db_table),
+        product=connection.ops.quote_name(Product._meta.db_table),
+    )
+    slot = random.randrange(settings.PRODUCT_SALES_SHARDS)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [slot, count, product_id])
+
+
+def with_sales(queryset):
+    """
+    Annotates a Product queryset with live_sales: the folded count plus the unflushed shards.
+    """
+    shards = ProductSalesShard.objects.filter(product_id=OuterRef('pk')).order_by().values('product_id').annotate(
+        total=Sum('count'),
+    ).values('total')
+    return queryset.annotate(live_sales=F('sales') + Coalesce(Subquery(shards), Value(0)))
+
+
+def product_sales(product):
+    """
+    Live sales count of one product, using the with_sales annotation when present.
+    """
+    if hasattr(product, 'live_sales'):
+        return product.live_sales
+    unflushed = ProductSalesShard.objects.filter(product_id=product.pk).aggregate(total=Sum('count'))['total']
+    return product.sales + (unflushed or 0)
+
+
+def flush_sales():
+    """
+    Folds every non-zero shard into Product.sales and resets it, in one transaction.
+    - Shards are locked in (product, slot) order; a purchase only ever holds one shard lock, so
+      the flush cannot deadlock with it.
+    - Shard rows are zeroed rather than deleted, so the next purchase updates in place.
+    Returns the number of sales folded.
+    """
+    with transaction.atomic():
+        shards = list(
+            ProductSalesShard.objects.select_for_update().filter(count__gt=0).order_by('product_id', 'slot')
+        )
+        if not shards:
+            return 0
+        totals = defaultdict(int)
+        for shard in shards:
+            totals[shard.product_id] += shard.count
+        for product_id, total in totals.items():
+            Product.objects.filter(id=product_id).update(sales=F('sales') + total)
+        ProductSalesShard.objects.filter(id__in=[shard.id for shard in shards]).update(count=0)
+    return sum(totals.values())
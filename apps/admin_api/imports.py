@@ -0,0 +1,283 @@
+# apps/admin_api/imports.py
+"""
+Bulk product import from a CSV, or a ZIP holding one CSV plus the media it references.
+- Every row, category and media path is checked before anything is uploaded or written;
+  the import is all-or-nothing.
+- Media is read into memory one file per upload thread, so ZIP members are bounded by their
+  uncompressed size: IMPORT_MAX_MEDIA_SIZE per file and IMPORT_MAX_ARCHIVE_SIZE for the archive.
+- Media uploads run concurrently on a bounded thread pool (settings.MEDIA_UPLOAD_WORKERS)
+  through the configured storage backend (apps/raw/media.py); a path used by several rows is
+  uploaded once. Thumbnails are validated with the rows and uploaded as resized derivatives
+  (apps/raw/images.py), as in ProductSerializer.
+- Products are written with one bulk_create; since that bypasses post_save, the catalog
+  generation is bumped here.
+"""
+import csv
+import os
+import posixpath
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, TextIOWrapper
+from django.conf import settings
+from django.db import transaction
+from apps.raw.media import upload_media
+from apps.raw.images import InvalidImage, make_derivatives, validate_image
+from apps.admin_api.caching import CATALOG, bump_generation_on_commit
+from apps.admin_api.models import Category, Product
+
+IMPORT_BATCH_SIZE = 500
+THUMBNAIL_SIZE = 1024  # derivative stored in thumbnail_url, as for ProductSerializer
+MEDIA_FIELDS = {
+    # CSV column: (Product field, storage folder, resource type)
+    'thumbnail': ('thumbnail_url', 'product_thumbnails', 'image'),
+    'file': ('file_url', 'product_files', 'raw'),
+}
+
+
+class ImportFileError(Exception):
+    """
+    The uploaded file is not a readable CSV or ZIP.
+    """
+
+
+class ZipMedia:
+    """
+    Media files inside a ZIP, relative to the directory holding its CSV.
+    Reads are serialized: a ZipFile must not be read from several threads at once.
+    """
+    def __init__(self, archive, base):
+        self.archive = archive
+        self.base = base
+        self.members = {info.filename: info.file_size for info in archive.infolist() if not info.is_dir()}
+        self.lock = threading.Lock()
+
+    def resolve(self, path):
+        member = posixpath.normpath(posixpath.join(self.base, path.replace('\\', '/')))
+        return member if member in self.members else None
+
+    def size(self, member):
+        return self.members[member]
+
+    def read(self, member):
+        with self.lock:
+            return self.archive.read(member)
+
+
+class DirectoryMedia:
+    """
+    Media files on disk, relative to the CSV's directory (management command).
+    """
+    def __init__(self, base):
+        self.base = os.path.realpath(base)
+
+    def resolve(self, path):
+        full = os.path.realpath(os.path.join(self.base, path))
+        if os.path.commonpath([full, self.base]) != self.base or not os.path.isfile(full):
+            return None
+        return full
+
+    def size(self, member):
+        return os.path.getsize(member)
+
+    def read(self, member):
+        with open(member, 'rb') as handle:
+            return handle.read()
+
+
+def _csv_rows(handle):
+    reader = csv.DictReader(TextIOWrapper(handle, encoding='utf-8-sig', newline=''))
+    # Blank cells count as missing, so optional columns fall back to their defaults
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        for row in reader
+    ]
+
+
+def read_import_file(upload, media_dir=None):
+    """
+    Returns (rows, media) from a CSV or ZIP file object.
+    - A ZIP must contain exactly one .csv and at most IMPORT_MAX_ARCHIVE_SIZE bytes once uncompressed;
+      media paths resolve inside the archive.
+    - A bare CSV resolves media paths under media_dir when given, else it can only use *_url columns.
+    Raises ImportFileError if the file cannot be read.
+    """
+    try:
+        if zipfile.is_zipfile(upload):
+            upload.seek(0)
+            archive = zipfile.ZipFile(upload)
+            # Declared sizes are enforced on read (zipfile stops at file_size), so they bound memory
+            if sum(info.file_size for info in archive.infolist()) > settings.IMPORT_MAX_ARCHIVE_SIZE:
+                raise ImportFileError(
+                    f"The ZIP must be at most {settings.IMPORT_MAX_ARCHIVE_SIZE // (1024 * 1024)} MB uncompressed."
+                )
+            sheets = [
+                name for name in archive.namelist()
+                if name.lower().endswith('.csv') and not name.startswith('__MACOSX/')
+            ]
+            if len(sheets) != 1:
+                raise ImportFileError("The ZIP must contain exactly one .csv file.")
+            with archive.open(sheets[0]) as handle:
+                rows = _csv_rows(handle)
+            return rows, ZipMedia(archive, posixpath.dirname(sheets[0]))
+        upload.seek(0)
+        return _csv_rows(upload), DirectoryMedia(media_dir) if media_dir else None
+    except (zipfile.BadZipFile, UnicodeDecodeError, csv.Error):
+        raise ImportFileError("Could not read the CSV or ZIP file.")
+
+
+def resolve_categories(rows):
+    """
+    Maps each row's category (name, case-insensitive, or id) to a category id in one query.
+    Returns (category ids by row index, unknown category names by row index).
+    """
+    categories = list(Category.objects.values_list('id', 'name'))
+    by_name = {name.lower(): category_id for category_id, name in categories}
+    ids = {category_id for category_id, _ in categories}
+
+    resolved, missing = {}, {}
+    for index, row in enumerate(rows, start=1):
+        value = row['category']
+        category_id = int(value) if value.isdigit() and int(value) in ids else by_name.get(value.lower())
+        if category_id is None:
+            missing[index] = value
+        else:
+            resolved[index] = category_id
+    return resolved, missing
+
+
+def create_categories(missing):
+    """
+    Creates the unknown categories in one bulk_create.
+    Returns category ids by row index for the rows in missing.
+    """
+    names = {name.lower(): name for name in missing.values()}
+    Category.objects.bulk_create([Category(name=name) for name in names.values()], ignore_conflicts=True)
+    by_name = {
+        name.lower(): category_id
+        for category_id, name in Category.objects.filter(name__in=names.values()).values_list('id', 'name')
+    }
+    return {index: by_name[name.lower()] for index, name in missing.items()}
+
+
+def resolve_media(rows, media):
+    """
+    Checks every media path the rows reference; thumbnails are read and validated as images here,
+    so a bad picture fails the import before any upload starts.
+    Returns (upload jobs {(column, member): (folder, resource type, filename)}, error messages by row index).
+    """
+    jobs, errors, invalid = {}, {}, {}
+    for index, row in enumerate(rows, start=1):
+        for column, (_, folder, resource_type) in MEDIA_FIELDS.items():
+            path = row.get(column)
+            if not path:
+                continue
+            member = media.resolve(path) if media else None
+            if member is None:
+                errors[index] = (
+                    f"Media file '{path}' not found." if media
+                    else f"'{column}' paths need a ZIP upload; use {column}_url for hosted files."
+                )
+                continue
+            if media.size(member) > settings.IMPORT_MAX_MEDIA_SIZE:
+                errors[index] = (
+                    f"Media file '{path}' is larger than {settings.IMPORT_MAX_MEDIA_SIZE // (1024 * 1024)} MB."
+                )
+                continue
+            key = (column, member)
+            if column == 'thumbnail' and key not in jobs and key not in invalid:
+                try:
+                    validate_image(BytesIO(media.read(member)))
+                except InvalidImage as exc:
+                    invalid[key] = str(exc)
+            if key in invalid:
+                errors[index] = f"Media file '{path}': {invalid[key]}"
+                continue
+            jobs[key] = (folder, resource_type, posixpath.basename(path))
+    return jobs, errors
+
+
+def upload_all(jobs, media, workers=None):
+    """
+    Uploads every job on a pool of at most `workers` threads.
+    Returns ((URL, derivative URLs by size) by job key, error messages by job key).
+    """
+    def upload(item):
+        (column, member), (folder, resource_type, name) = item
+        data = media.read(member)
+        if column != 'thumbnail':
+            return upload_media(data, folder, name=name, resource_type=resource_type), {}
+        stem = posixpath.splitext(name)[0]
+        variants = {}
+        for sizes, content, extension in make_derivatives(BytesIO(data)):
+            url = upload_media(content, folder, name=f'{stem}-{sizes[0]}.{extension}')
+            variants.update((str(size), url) for size in sizes)
+        return variants[str(THUMBNAIL_SIZE)], variants
+
+    urls, errors = {}, {}
+    if not jobs:
+        return urls, errors
+    workers = min(workers or settings.MEDIA_UPLOAD_WORKERS, len(jobs))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='product-import') as pool:
+        futures = {key: pool.submit(upload, (key, job)) for key, job in jobs.items()}
+        for key, future in futures.items():
+            try:
+                urls[key] = future.result()
+            except Exception as exc:  # storage backends raise their own error types
+                errors[key] = f"Upload of '{posixpath.basename(key[1])}' failed: {exc}"
+    return urls, errors
+
+
+def import_products(rows, media=None, create_missing=False, dry_run=False, workers=None):
+    """
+    Validates, uploads and creates the products described by validated rows.
+    - create_missing creates unknown categories along with the products instead of rejecting the rows.
+    Returns (products, errors): errors maps row index to a message, and nothing is created
+    when it is not empty. A dry run stops before uploading.
+    """
+    category_ids, missing = resolve_categories(rows)
+    errors = {} if create_missing else {index: f"Category '{name}' does not exist." for index, name in missing.items()}
+    jobs, media_errors = resolve_media(rows, media)
+    errors.update(media_errors)
+    if errors or dry_run:
+        return [], errors
+
+    urls, upload_errors = upload_all(jobs, media, workers=workers)
+    if upload_errors:
+        for index, row in enumerate(rows, start=1):
+            for column in MEDIA_FIELDS:
+                member = media.resolve(row[column]) if row.get(column) else None
+                if (column, member) in upload_errors:
+                    errors[index] = upload_errors[(column, member)]
+        return [], errors
+
+    with transaction.atomic():
+        if missing:
+            category_ids.update(create_categories(missing))
+        products = build_products(rows, category_ids, urls, media)
+        Product.objects.bulk_create(products, batch_size=IMPORT_BATCH_SIZE)
+        bump_generation_on_commit(CATALOG)  # bulk_create sends no post_save
+    return products, {}
+
+
+def build_products(rows, category_ids, urls, media):
+    products = []
+    for index, row in enumerate(rows, start=1):
+        fields = {}
+        for column, (field, _, _) in MEDIA_FIELDS.items():
+            path = row.get(column)
+            if path:
+                fields[field], variants = urls[(column, media.resolve(path))]
+                if variants:
+                    fields['thumbnail_variants'] = variants
+            else:
+                fields[field] = row.get(field) or None
+        products.append(Product(
+            name=row['name'],
+            description=row['description'],
+            price=row['price'],
+            category_id=category_ids[index],
+            paused=row['paused'],
+            **fields
+        ))
+    return products
@@ -0,0 +1,57 @@
+# apps/admin_api/management/commands/export_ledger.py
+import sys
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from apps.raw.models import Transaction
+from apps.admin_api.exports import LEDGER_EXPORT_FORMATS, ledger_queryset, ledger_rows, ledger_chunks, gzip_chunks
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the Transaction ledger as CSV or NDJSON for audits, oldest first. "
+        "Rows are read in keyset chunks, so memory stays flat for any ledger size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=_date, help='First day to include (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='end', type=_date, help='Last day to include (YYYY-MM-DD).')
+        parser.add_argument('--type', dest='types', action='append', choices=[choice for choice, _ in Transaction.TRANSACTION_TYPES], help='Transaction type to include; repeatable.')
+        parser.add_argument('--status', dest='statuses', action='append', choices=[choice for choice, _ in Transaction.STATUS_CHOICES], help='Status to include; repeatable.')
+        parser.add_argument('--format', dest='file_format', choices=LEDGER_EXPORT_FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output.')
+        parser.add_argument('--output', '-o', help='File to write to (default: stdout).')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows fetched per query.')
+
+    def handle(self, *args, **options):
+        if options['start'] and options['end'] and options['start'] > options['end']:
+            raise CommandError("--from must not be after --to.")
+        queryset = ledger_queryset(
+            start=options['start'],
+            end=options['end'],
+            types=options['types'],
+            statuses=options['statuses'],
+        )
+        chunks = ledger_chunks(ledger_rows(queryset, chunk_size=options['chunk_size']), options['file_format'])
+        if options['gzip']:
+            chunks = gzip_chunks(chunks)
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            written = 0
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
+        if options['output']:
+            self.stderr.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}."))
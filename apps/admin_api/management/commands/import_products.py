@@ -0,0 +1,58 @@
+# apps/admin_api/management/commands/import_products.py
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.admin_api.imports import ImportFileError, read_import_file, import_products
+from apps.admin_api.serializers import ProductImportRowSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Create products in bulk from a CSV, or a ZIP holding one CSV plus its media. "
+        "thumbnail / file columns are paths inside the ZIP, or relative to the CSV's directory. "
+        "Media is uploaded in parallel and nothing is created unless every row succeeds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or ZIP file to import.')
+        parser.add_argument('--create-categories', action='store_true', help='Create categories that do not exist yet.')
+        parser.add_argument('--workers', type=int, help='Concurrent uploads (default: MEDIA_UPLOAD_WORKERS).')
+        parser.add_argument('--dry-run', action='store_true', help='Validate rows, categories and media paths only.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f"No such file: {path}")
+        started = time.monotonic()
+        with open(path, 'rb') as upload:
+            try:
+                rows, media = read_import_file(upload, media_dir=os.path.dirname(os.path.abspath(path)))
+            except ImportFileError as exc:
+                raise CommandError(str(exc))
+
+            if not rows:
+                raise CommandError("The CSV has no rows.")
+            serializer = ProductImportRowSerializer(data=rows, many=True)
+            if not serializer.is_valid():
+                for index, row_errors in enumerate(serializer.errors, start=1):
+                    for field, messages in row_errors.items():
+                        self.stderr.write(f"Row {index}: {field}: {' '.join(str(message) for message in messages)}")
+                raise CommandError("No products were imported because some rows are invalid.")
+
+            created, errors = import_products(
+                serializer.validated_data,
+                media,
+                create_missing=options['create_categories'],
+                dry_run=options['dry_run'],
+                workers=options['workers'],
+            )
+        if errors:
+            for index, error in sorted(errors.items()):
+                self.stderr.write(f"Row {index}: {error}")
+            raise CommandError("No products were imported because some rows are invalid.")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{len(rows)} rows are valid; nothing was imported (dry run)."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(created)} products in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,66 @@
+# apps/admin_api/management/commands/rollup_transactions.py
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from apps.raw.models import Transaction
+from apps.admin_api.analytics import refresh_daily_stats, refresh_product_sales, refresh_product_rankings
+from apps.admin_api.caching import LEDGER, ROLLUP, bump_generation
+from apps.admin_api.counters import flush_sales
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the ProductDailySales rollup and the top-product rankings read by the analytics dashboards, "
+        "and fold the sharded sales counters into Product.sales. "
+        "Run it every few minutes (it refreshes today and yesterday by default), and once with --all after deploying. "
+        "TransactionDailyStats is kept current by every posting; --rebuild-stats rebuilds it from the ledger "
+        "for the same days (backfill after deploying, or repair)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Refresh this many days up to and including today.')
+        parser.add_argument('--from', dest='start', type=_date, help='First day to refresh (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='end', type=_date, help='Last day to refresh (YYYY-MM-DD, default today).')
+        parser.add_argument('--all', action='store_true', help='Refresh every day since the first transaction.')
+        parser.add_argument('--step', type=int, default=31, help='Days rebuilt per database transaction.')
+        parser.add_argument('--rebuild-stats', action='store_true', help='Also rebuild TransactionDailyStats for these days.')
+
+    def handle(self, *args, **options):
+        end = options['end'] or timezone.localdate()
+        if options['all']:
+            first = Transaction.objects.aggregate(first=Min('created_at'))['first']
+            if first is None:
+                self.stdout.write("No transactions to roll up.")
+                return
+            start = timezone.localtime(first).date()
+        elif options['start']:
+            start = options['start']
+        else:
+            start = end - timedelta(days=max(options['days'], 1) - 1)
+        if start > end:
+            raise CommandError("--from must not be after --to.")
+
+        written = 0
+        current = start
+        while current <= end:
+            chunk_end = min(current + timedelta(days=options['step'] - 1), end)
+            if options['rebuild_stats']:
+                written += refresh_daily_stats(current, chunk_end)
+            written += refresh_product_sales(current, chunk_end)
+            current = chunk_end + timedelta(days=1)
+        ranked = refresh_product_rankings()
+        flushed = flush_sales()
+        bump_generation(ROLLUP)  # cached analytics were computed from the previous rollup
+        if options['rebuild_stats']:
+            bump_generation(LEDGER)  # TransactionDailyStats views are cached under LEDGER
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {start} to {end}: {written} rows, {ranked} ranking entries, {flushed} sales flushed."
+        ))
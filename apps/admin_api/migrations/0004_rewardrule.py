@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0003_admin_otp_code_admin_otp_expiry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RewardRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('reason', models.CharField(max_length=255)),
+                ('grade', models.CharField(blank=True, choices=[('CM2', 'CM2'), ('6ème', '6ème'), ('5ème', '5ème'), ('4ème', '4ème'), ('3ème', '3ème'), ('2nde', '2nde'), ('1ère', '1ère'), ('Tle', 'Tle')], max_length=10, null=True)),
+                ('is_active', models.BooleanField(blank=True, null=True)),
+                ('active_after', models.DateTimeField(blank=True, null=True)),
+                ('active_before', models.DateTimeField(blank=True, null=True)),
+                ('joined_after', models.DateTimeField(blank=True, null=True)),
+                ('joined_before', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_run_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
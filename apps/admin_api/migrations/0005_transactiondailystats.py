@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:49
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0004_rewardrule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('ADMIN_GRANT', 'Admin Grant'), ('TASK_REWARD', 'Task Reward'), ('TRANSFER_SEND', 'Transfer Send'), ('TRANSFER_RECEIVE', 'Transfer Receive'), ('SIGNUP_BONUS', 'Signup Bonus'), ('DAILY_LOGIN', 'Daily Login'), ('SHOP_REDEMPTION', 'Shop Redemption')], max_length=20)),
+                ('status', models.CharField(choices=[('COMPLETED', 'Completed'), ('FAILED', 'Failed')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='admin_api.category')),
+            ],
+            options={
+                'verbose_name_plural': 'transaction daily stats',
+                'unique_together': {('day', 'transaction_type', 'status', 'category')},
+            },
+        ),
+    ]
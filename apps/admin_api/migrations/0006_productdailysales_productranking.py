@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0005_transactiondailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('sales', models.PositiveIntegerField(default=0)),
+                ('coins', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='admin_api.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='product_daily_sales_day_idx')],
+                'unique_together': {('product', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('7d', 'Last 7 days'), ('30d', 'Last 30 days'), ('all', 'All time')], max_length=3)),
+                ('rank', models.PositiveIntegerField()),
+                ('sales', models.PositiveIntegerField(default=0)),
+                ('coins', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='admin_api.product')),
+            ],
+            options={
+                'unique_together': {('window', 'rank')},
+            },
+        ),
+    ]
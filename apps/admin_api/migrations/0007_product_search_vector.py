@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:56
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# 'simple' keeps matching language-neutral: product names and descriptions mix French and English.
+CREATE_SEARCH_TRIGGER = """
+CREATE OR REPLACE FUNCTION admin_api_product_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS admin_api_product_search_vector_trg ON admin_api_product;
+CREATE TRIGGER admin_api_product_search_vector_trg
+    BEFORE INSERT OR UPDATE OF name, description ON admin_api_product
+    FOR EACH ROW EXECUTE FUNCTION admin_api_product_search_vector();
+
+UPDATE admin_api_product SET
+    search_vector =
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B');
+"""
+
+DROP_SEARCH_TRIGGER = """
+DROP TRIGGER IF EXISTS admin_api_product_search_vector_trg ON admin_api_product;
+DROP FUNCTION IF EXISTS admin_api_product_search_vector();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH_TRIGGER)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0006_productdailysales_productranking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0007_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_shards', to='admin_api.product')),
+            ],
+            options={
+                'unique_together': {('product', 'slot')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0008_productsalesshard'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='category',
+            name='item_count',
+        ),
+    ]
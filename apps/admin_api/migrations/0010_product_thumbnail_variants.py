@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0009_remove_category_item_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0010_product_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='transactiondailystats',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='transactiondailystats',
+            name='slot',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='transactiondailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('day', 'transaction_type', 'status', 'category', 'slot'), name='daily_stats_category_slot_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='transactiondailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('day', 'transaction_type', 'status', 'slot'), name='daily_stats_slot_uniq'),
+        ),
+    ]
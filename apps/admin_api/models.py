@@ -1,6 +1,10 @@
 # apps/admin_api/models.py
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from apps.users.models import User
+from apps.raw.models import Transaction
+from decimal import Decimal
 from django.utils import timezone
 import cloudinary.uploader
 import random
@@ -11,21 +15,15 @@ class Category(models.Model):
     Model to manage categories in the marketplace.
     - name: Unique name of the category.
     - paused: Boolean to hide category and its items from the app's shop.
-    - item_count: Auto-calculated number of active products in the category.
+    - The number of products in a category is not stored: views annotate it as item_count
+      (see with_item_counts), so product saves and deletes never write to the category row.
     """
     name = models.CharField(max_length=100, unique=True)
     paused = models.BooleanField(default=False)
-    item_count = models.PositiveIntegerField(default=0)  # Updated dynamically via Product model
 
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        # Recalculate item_count if needed (handled by Product signals in practice)
-        if not self.pk:  # New category
-            self.item_count = 0
-        super().save(*args, **kwargs)
-
 class Product(models.Model):
     """
     Model to manage products in the marketplace.
@@ -33,39 +31,186 @@ class Product(models.Model):
     - description: Detailed description of the product.
     - price: Coin price for purchase.
     - category: Foreign key to the Category model.
-    - thumbnail_url: URL to the product thumbnail image (stored in Cloudinary).
+    - thumbnail_url: URL to the product thumbnail image (stored in Cloudinary), the 1024px derivative.
+    - thumbnail_variants: URLs of every thumbnail derivative by size ({"64": url, "256": url, "1024": url}).
     - file_url: URL to an optional PDF file (stored in Cloudinary, downloadable after purchase).
     - paused: Boolean to hide the product from the app's shop (independent of category pause).
-    - sales: Number of times the product was purchased, updated via Transaction signals.
+    - sales: Number of purchases folded in from ProductSalesShard by flush_sales; the live total
+      also includes the unflushed shards (see apps/admin_api/counters.py).
     - date_submitted: Creation date, editable during updates.
+    - search_vector: tsvector over name (weight A) and description (weight B), kept up to date by a
+      PostgreSQL trigger (migration 0007) and GIN-indexed; unused on other databases.
     """
     name = models.CharField(max_length=200)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     thumbnail_url = models.URLField(max_length=500, null=True, blank=True)
+    thumbnail_variants = models.JSONField(default=dict, blank=True)
     file_url = models.URLField(max_length=500, null=True, blank=True)
     paused = models.BooleanField(default=False)
     sales = models.PositiveIntegerField(default=0)
     date_submitted = models.DateTimeField(default=timezone.now)  # Editable, defaults to creation time
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [GinIndex(fields=['search_vector'], name='product_search_vector_idx')]
 
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
-        # Update category item_count if this is a new product or category changes
-        is_new = not self.pk
-        old_category_id = None
-        if not is_new:
-            old_category_id = Product.objects.get(pk=self.pk).category_id
+        if self.pk and kwargs.get('update_fields') is None:
+            # sales is only written by flush_sales; a full save must not put back a stale count
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'sales'
+            ]
         super().save(*args, **kwargs)
-        if is_new or (old_category_id and old_category_id != self.category_id):
-            if is_new:
-                self.category.item_count += 1
-            elif old_category_id != self.category_id:
-                Category.objects.filter(id=old_category_id).update(item_count=models.F('item_count') - 1)
-                self.category.item_count += 1
-            self.category.save(update_fields=['item_count'])
+
+def with_item_counts(queryset):
+    """
+    Annotates a Category queryset with item_count, the number of products in each category.
+    """
+    return queryset.annotate(item_count=models.Count('products'))
+
+class RewardRule(models.Model):
+    """
+    Model for mass rewards such as "give 20 coins to every active 4ème student".
+    - amount / reason: coins credited to each matching student and the ADMIN_GRANT description.
+    - grade, is_active: exact filters, ignored when left empty.
+    - active_after / active_before: bounds on the student's last_activity.
+    - joined_after / joined_before: bounds on the student's date_joined.
+    - last_run_at / last_run_count: outcome of the most recent (non dry-run) run.
+    """
+    name = models.CharField(max_length=100)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    reason = models.CharField(max_length=255)
+    grade = models.CharField(max_length=10, choices=User.GRADE_CHOICES, null=True, blank=True)
+    is_active = models.BooleanField(null=True, blank=True)
+    active_after = models.DateTimeField(null=True, blank=True)
+    active_before = models.DateTimeField(null=True, blank=True)
+    joined_after = models.DateTimeField(null=True, blank=True)
+    joined_before = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_run_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+    def matching_students(self):
+        """Queryset of the non-staff users this rule currently selects."""
+        students = User.objects.filter(is_staff=False)
+        if self.grade:
+            students = students.filter(grade=self.grade)
+        if self.is_active is not None:
+            students = students.filter(is_active=self.is_active)
+        if self.active_after:
+            students = students.filter(last_activity__gte=self.active_after)
+        if self.active_before:
+            students = students.filter(last_activity__lt=self.active_before)
+        if self.joined_after:
+            students = students.filter(date_joined__gte=self.joined_after)
+        if self.joined_before:
+            students = students.filter(date_joined__lt=self.joined_before)
+        return students
+
+class TransactionDailyStats(models.Model):
+    """
+    Daily rollup of the Transaction ledger read by the analytics dashboards.
+    - One row per (day, transaction_type, status, category, slot); category is the purchased product's category (shop redemptions), else null.
+    - total / count: sum of amounts and number of transactions in the group.
+    - Every posting adds itself to one of DAILY_STATS_SHARDS slots of today's group, in the posting's
+      transaction (see record_postings in apps/admin_api/analytics.py); readers sum the slots.
+    - rollup_transactions --rebuild-stats rebuilds whole days from the ledger (backfill and repair).
+    """
+    day = models.DateField()
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    status = models.CharField(max_length=10, choices=Transaction.STATUS_CHOICES)
+    category = models.ForeignKey(Category, on_delete=models.DO_NOTHING, null=True, blank=True, related_name='+', db_constraint=False)
+    slot = models.PositiveSmallIntegerField(default=0)
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Two partial constraints, since NULL categories never conflict in a plain unique index;
+        # they are the ON CONFLICT targets of the per-posting upsert
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'transaction_type', 'status', 'category', 'slot'],
+                condition=models.Q(category__isnull=False),
+                name='daily_stats_category_slot_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['day', 'transaction_type', 'status', 'slot'],
+                condition=models.Q(category__isnull=True),
+                name='daily_stats_slot_uniq',
+            ),
+        ]
+        verbose_name_plural = 'transaction daily stats'
+
+    def __str__(self):
+        return f"{self.day} {self.transaction_type}/{self.status}: {self.total} ({self.count})"
+
+class ProductDailySales(models.Model):
+    """
+    Completed purchases per product per day, rebuilt alongside TransactionDailyStats.
+    - sales / coins: number of purchases and coins spent on the product that day.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    sales = models.PositiveIntegerField(default=0)
+    coins = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        unique_together = ('product', 'day')
+        indexes = [models.Index(fields=['day'], name='product_daily_sales_day_idx')]
+
+    def __str__(self):
+        return f"{self.day} {self.product_id}: {self.sales}"
+
+class ProductSalesShard(models.Model):
+    """
+    Unflushed purchase increments for a product, spread over PRODUCT_SALES_SHARDS slots.
+    - Each purchase adds to one random slot, so concurrent buyers of the same product rarely wait
+      on the same row; the live sales count is Product.sales plus the sum of its shards.
+    - flush_sales folds the shards into Product.sales and resets them to zero.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_shards')
+    slot = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('product', 'slot')
+
+    def __str__(self):
+        return f"{self.product_id}[{self.slot}]: {self.count}"
+
+class ProductRanking(models.Model):
+    """
+    Precomputed top products per window, read by the top-products endpoint.
+    - window: '7d', '30d' or 'all'; rank 1 is the best seller in the window.
+    - Rebuilt each time the rollup runs: dated windows from ProductDailySales, 'all' from the sales counters.
+    """
+    WINDOW_CHOICES = [
+        ('7d', 'Last 7 days'),
+        ('30d', 'Last 30 days'),
+        ('all', 'All time'),
+    ]
+
+    window = models.CharField(max_length=3, choices=WINDOW_CHOICES)
+    rank = models.PositiveIntegerField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    sales = models.PositiveIntegerField(default=0)
+    coins = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('window', 'rank')
+
+    def __str__(self):
+        return f"{self.window} #{self.rank}: {self.product_id}"
 
 class Admin(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, limit_choices_to={'is_superuser': True}, related_name='admin_profile')
@@ -0,0 +1,46 @@
+# apps/admin_api/search.py
+"""
+Product search for the shop and admin product lists (?q=).
+- On PostgreSQL, matches Product.search_vector (trigger-maintained, GIN-indexed; see migration
+  admin_api 0007) with a prefix query, so "mat" finds "Mathématiques", and orders by ts_rank
+  with name matches weighted above description matches.
+- Elsewhere (SQLite in development), falls back to case-insensitive substring matching on
+  name and description, name matches first.
+"""
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+MAX_TERMS = 8  # longer queries are truncated rather than rejected
+
+
+def search_terms(q):
+    """
+    Words of a raw query string, lowercased; punctuation and tsquery operators are dropped.
+    """
+    return [term.lower() for term in re.findall(r'\w+', q or '')][:MAX_TERMS]
+
+
+def search_products(queryset, q):
+    """
+    Filters a Product queryset to the products matching every word of q, best matches first.
+    Returns the queryset unchanged when q has no words.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='simple')
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank('search_vector', query),
+        ).order_by('-rank', 'id')
+
+    name_match = Q()
+    for term in terms:
+        name_match &= Q(name__icontains=term)
+        queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+    return queryset.annotate(
+        rank=Case(When(name_match, then=Value(1)), default=Value(0), output_field=IntegerField()),
+    ).order_by('-rank', 'id')
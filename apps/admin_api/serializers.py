@@ -2,12 +2,17 @@
 from rest_framework import serializers
 from apps.users.models import User
 from apps.raw.models import Wallet, Transaction
-from apps.admin_api.models import Category, Product, Admin
+from apps.admin_api.models import Category, Product, Admin, RewardRule
+from apps.admin_api.counters import product_sales
 from decimal import Decimal
+from datetime import date
+import calendar
+from django.utils import timezone
 from django.contrib.auth.password_validation import validate_password
-import cloudinary
-import cloudinary.uploader
 from django.conf import settings
+from django.db import transaction
+from apps.raw.media import stage_upload, stage_image
+from apps.raw.images import InvalidImage
 
 class AdminLoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -89,21 +94,21 @@ class AdminProfileSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         profile_picture = validated_data.pop('profile_picture', None)
         instance = Admin.objects.create(**validated_data)
-        if profile_picture:
-            result = cloudinary.uploader.upload(profile_picture, folder='admin_profiles')
-            instance.profile_picture = result['secure_url']
-            instance.save()
+        self.stage_picture(instance, profile_picture)
         return instance
 
     def update(self, instance, validated_data):
         profile_picture = validated_data.pop('profile_picture', None)
         instance = super().update(instance, validated_data)
-        if profile_picture:
-            result = cloudinary.uploader.upload(profile_picture, folder='admin_profiles')
-            instance.profile_picture = result['secure_url']
-            instance.save()
+        self.stage_picture(instance, profile_picture)
         return instance
 
+    def stage_picture(self, instance, profile_picture):
+        # Uploaded in the background; profile_picture keeps its old URL until the upload is done
+        self.uploads = []
+        if profile_picture:
+            self.uploads.append(stage_upload(profile_picture, instance, 'profile_picture', 'admin_profiles', user=instance.user))
+
     def to_representation(self, instance):
         # Ensure profile_picture is included as a string (URL) in the response
         ret = super().to_representation(instance)
@@ -141,6 +146,113 @@ class AllocateCoinsSerializer(serializers.Serializer):
             raise serializers.ValidationError("Invalid user ID.")
         return value
 
+class BulkAllocationRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk allocation. User checks happen once for the whole batch in the view.
+    """
+    user_id = serializers.IntegerField()
+    amount = serializers.DecimalField(min_value=Decimal('0.01'), max_digits=15, decimal_places=2)
+    reason = serializers.CharField(max_length=255)
+
+class BulkAllocateCoinsSerializer(serializers.Serializer):
+    allocations = BulkAllocationRowSerializer(many=True, allow_empty=False, max_length=5000)
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk product import. Categories and media paths are checked once for the whole batch.
+    - category: category name (case-insensitive) or id.
+    - thumbnail / file: paths of media files inside the ZIP (or next to the CSV for the command);
+      thumbnail_url / file_url: already-hosted URLs, used when no path is given.
+    """
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField()
+    price = serializers.DecimalField(min_value=Decimal('0.00'), max_digits=10, decimal_places=2)
+    category = serializers.CharField(max_length=100)
+    paused = serializers.BooleanField(default=False)
+    thumbnail = serializers.CharField(required=False, allow_blank=True, default='')
+    file = serializers.CharField(required=False, allow_blank=True, default='')
+    thumbnail_url = serializers.URLField(max_length=500, required=False, allow_blank=True, default='')
+    file_url = serializers.URLField(max_length=500, required=False, allow_blank=True, default='')
+
+class ProductImportSerializer(serializers.Serializer):
+    products = ProductImportRowSerializer(many=True, allow_empty=False, max_length=5000)
+    create_categories = serializers.BooleanField(default=False)
+    dry_run = serializers.BooleanField(default=False)
+
+class RewardRuleSerializer(serializers.ModelSerializer):
+    amount = serializers.DecimalField(min_value=Decimal('0.01'), max_digits=15, decimal_places=2)
+
+    class Meta:
+        model = RewardRule
+        fields = ['id', 'name', 'amount', 'reason', 'grade', 'is_active', 'active_after', 'active_before',
+                  'joined_after', 'joined_before', 'created_at', 'last_run_at', 'last_run_count']
+        read_only_fields = ['created_at', 'last_run_at', 'last_run_count']
+
+class RewardRuleRunSerializer(serializers.Serializer):
+    dry_run = serializers.BooleanField(default=False)
+
+class LedgerExportSerializer(serializers.Serializer):
+    """
+    Filters for the ledger export (query params from, to, type, status, file_format, gzip).
+    - type and status accept repeated or comma-separated values.
+    """
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    types = serializers.ListField(child=serializers.ChoiceField(choices=Transaction.TRANSACTION_TYPES), required=False)
+    statuses = serializers.ListField(child=serializers.ChoiceField(choices=Transaction.STATUS_CHOICES), required=False)
+    file_format = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+    gzip = serializers.BooleanField(default=False)
+
+    @classmethod
+    def from_query_params(cls, query_params):
+        def values(name):
+            return [value for param in query_params.getlist(name) for value in param.split(',') if value]
+
+        data = {'types': values('type'), 'statuses': values('status')}
+        for field, param in (('start', 'from'), ('end', 'to'), ('file_format', 'file_format'), ('gzip', 'gzip')):
+            if param in query_params:
+                data[field] = query_params[param]
+        return cls(data=data)
+
+    def validate(self, data):
+        if data.get('start') and data.get('end') and data['start'] > data['end']:
+            raise serializers.ValidationError("'from' must not be after 'to'.")
+        return data
+
+class AnalyticsPeriodSerializer(serializers.Serializer):
+    """
+    Reporting period for the analytics views (query params month, from, to).
+    - ?month=YYYY-MM selects a calendar month; ?from=YYYY-MM-DD&to=YYYY-MM-DD an inclusive range (to defaults to today).
+    - validated_data holds start/end dates, or neither when no period was given.
+    """
+    month = serializers.RegexField(r'^\d{4}-(0[1-9]|1[0-2])$', required=False, error_messages={'invalid': 'Use the YYYY-MM format.'})
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    @classmethod
+    def from_query_params(cls, query_params):
+        data = {}
+        for field, param in (('month', 'month'), ('start', 'from'), ('end', 'to')):
+            if param in query_params:
+                data[field] = query_params[param]
+        return cls(data=data)
+
+    def validate(self, data):
+        month = data.pop('month', None)
+        if month:
+            if data.get('start') or data.get('end'):
+                raise serializers.ValidationError("Use either 'month' or 'from'/'to', not both.")
+            year, month = map(int, month.split('-'))
+            data['start'] = date(year, month, 1)
+            data['end'] = date(year, month, calendar.monthrange(year, month)[1])
+        elif data.get('end') and not data.get('start'):
+            raise serializers.ValidationError("'from' is required with 'to'.")
+        elif data.get('start') and not data.get('end'):
+            data['end'] = timezone.localdate()
+        if data.get('start') and data['start'] > data['end']:
+            raise serializers.ValidationError("'from' must not be after 'to'.")
+        return data
+
 class TransactionHistorySerializer(serializers.ModelSerializer):
     type = serializers.SerializerMethodField()
     from_user = serializers.SerializerMethodField()
@@ -200,21 +312,9 @@ class StudentManagementSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'date_joined', 'is_active', 'balance', 'boiya_id', 'transactions']
 
     def get_transactions(self, obj):
-        return Transaction.objects.filter(
-            wallet__user=obj,
-            transaction_type__in=['TRANSFER_SEND', 'TRANSFER_RECEIVE']
-        ).count()
-
-class ExportStudentSerializer(serializers.ModelSerializer):
-    balance = serializers.DecimalField(max_digits=15, decimal_places=2, source='wallet.balance', read_only=True)
-    boiya_id = serializers.CharField(source='wallet.boiya_id', read_only=True)
-    transactions = serializers.SerializerMethodField()
-
-    class Meta:
-        model = User
-        fields = ['username', 'email', 'date_joined', 'is_active', 'balance', 'boiya_id', 'transactions']
-
-    def get_transactions(self, obj):
+        # Annotated by annotate_student_rows in list views; counted directly otherwise
+        if hasattr(obj, 'p2p_transactions'):
+            return obj.p2p_transactions
         return Transaction.objects.filter(
             wallet__user=obj,
             transaction_type__in=['TRANSFER_SEND', 'TRANSFER_RECEIVE']
@@ -225,40 +325,43 @@ class CategorySerializer(serializers.ModelSerializer):
     Serializer for Category model.
     - Handles creation and listing of categories.
     """
+    item_count = serializers.SerializerMethodField()
+
     class Meta:
         model = Category
         fields = ['id', 'name', 'paused', 'item_count']
 
+    def get_item_count(self, obj):
+        # Annotated by with_item_counts in category views; counted directly otherwise
+        if hasattr(obj, 'item_count'):
+            return obj.item_count
+        return obj.products.count()
+
 class ProductSerializer(serializers.ModelSerializer):
     """
     Serializer for Product model.
     - Handles creation, update, and listing of products.
-    - Manages Cloudinary uploads for thumbnail and file.
+    - Stages thumbnail and file for background upload; their URL fields are set when the uploads
+      finish, and the staged MediaUploads are left in self.uploads for the response.
+    - The thumbnail must be an image; it is stored as 64/256/1024px derivatives (thumbnail_variants),
+      and thumbnail_url is the 1024px one.
     - Filters category dropdown to non-paused categories.
     """
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.filter(paused=False))
+    sales = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'category', 'thumbnail_url', 'file_url', 'paused', 'sales', 'date_submitted']
+        fields = ['id', 'name', 'description', 'price', 'category', 'thumbnail_url', 'thumbnail_variants', 'file_url', 'paused', 'sales', 'date_submitted']
+        read_only_fields = ['thumbnail_variants']
 
     def create(self, validated_data):
         """
         Create a new product with optional thumbnail and file uploads.
         """
-        request = self.context.get('request')
-        thumbnail = request.FILES.get('thumbnail') if request else None
-        file = request.FILES.get('file') if request else None
-
-        if thumbnail:
-            result = cloudinary.uploader.upload(thumbnail, folder="product_thumbnails")
-            validated_data['thumbnail_url'] = result['secure_url']
-
-        if file:
-            result = cloudinary.uploader.upload(file, folder="product_files", resource_type="raw")
-            validated_data['file_url'] = result['secure_url']
-
-        product = Product.objects.create(**validated_data)
+        with transaction.atomic():
+            product = Product.objects.create(**validated_data)
+            self.stage_media(product)
         return product
 
     def update(self, instance, validated_data):
@@ -266,7 +369,6 @@ class ProductSerializer(serializers.ModelSerializer):
         Update an existing product with optional thumbnail and file uploads.
         Allows editing date_submitted and category.
         """
-        request = self.context.get('request')
         instance.name = validated_data.get('name', instance.name)
         instance.description = validated_data.get('description', instance.description)
         instance.price = validated_data.get('price', instance.price)
@@ -274,15 +376,26 @@ class ProductSerializer(serializers.ModelSerializer):
         instance.date_submitted = validated_data.get('date_submitted', instance.date_submitted)
         instance.paused = validated_data.get('paused', instance.paused)
 
+        with transaction.atomic():
+            instance.save()
+            self.stage_media(instance)
+        return instance
+
+    def stage_media(self, product):
+        request = self.context.get('request')
+        self.uploads = []
         thumbnail = request.FILES.get('thumbnail') if request else None
         if thumbnail:
-            result = cloudinary.uploader.upload(thumbnail, folder="product_thumbnails")
-            instance.thumbnail_url = result['secure_url']
-
+            try:
+                self.uploads.append(stage_image(
+                    thumbnail, product, 'thumbnail_url', 'product_thumbnails', 'thumbnail_variants', 1024, user=request.user
+                ))
+            except InvalidImage as exc:
+                raise serializers.ValidationError({'thumbnail': [str(exc)]})  # rolls back the product save
         file = request.FILES.get('file') if request else None
         if file:
-            result = cloudinary.uploader.upload(file, folder="product_files", resource_type="raw")
-            instance.file_url = result['secure_url']
+            self.uploads.append(stage_upload(file, product, 'file_url', 'product_files', resource_type='raw', user=request.user))
 
-        instance.save()
-        return instance
\ No newline at end of file
+    def get_sales(self, obj):
+        # Annotated by with_sales in list views; summed directly otherwise
+        return product_sales(obj)
\ No newline at end of file
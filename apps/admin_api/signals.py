@@ -1,21 +1,69 @@
 # apps/admin_api/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from apps.raw.models import Transaction
-from apps.admin_api.models import Product
-from django.db.models import F
+from apps.raw import ledger
+from apps.admin_api.models import Product, Category
+from apps.admin_api.caching import LEDGER, CATALOG, bump_generation_on_commit
+from apps.admin_api.counters import record_sale
+from apps.admin_api.analytics import record_postings
+
+COUNTER_FIELDS = {'sales'}
 
 @receiver(post_save, sender=Transaction)
 def update_product_sales(sender, instance, created, **kwargs):
     """
     Signal handler to update the sales count of a product when a SHOP_REDEMPTION transaction is created.
-    - Listens for post_save on Transaction model.
-    - Increments Product.sales if the transaction type is SHOP_REDEMPTION and product_id is provided.
+    - Listens for post_save on Transaction model; this is the only place purchases are counted.
+    - Adds the sale to one of the product's counter shards (see apps/admin_api/counters.py), inside
+      the posting's transaction; unknown product ids (e.g., deleted products) are ignored.
     """
     if created and instance.transaction_type == 'SHOP_REDEMPTION' and instance.product_id:
-        try:
-            product = Product.objects.get(id=instance.product_id)
-            product.sales = F('sales') + 1  # Atomic increment to avoid race conditions
-            product.save(update_fields=['sales'])
-        except Product.DoesNotExist:
-            pass  # Ignore if product_id is invalid (e.g., deleted product)
\ No newline at end of file
+        record_sale(instance.product_id)
+
+@receiver(post_save, sender=Transaction)
+def record_daily_stats(sender, instance, created, **kwargs):
+    """
+    Add a newly created Transaction to today's TransactionDailyStats, inside the posting's transaction.
+    - Shop redemptions are keyed by their product's category; unknown products (deleted) by none.
+    """
+    if not created:
+        return
+    category_id = None
+    if instance.transaction_type == 'SHOP_REDEMPTION' and instance.product_id:
+        category_id = Product.objects.filter(id=instance.product_id).values_list('category_id', flat=True).first()
+    record_postings([(instance.transaction_type, instance.status, category_id, 1, instance.amount)])
+
+@receiver(ledger.posted)
+def record_posted_daily_stats(sender, postings, **kwargs):
+    """
+    Add postings written with raw SQL or bulk_create to today's TransactionDailyStats.
+    - These paths never post shop redemptions, so no category is looked up.
+    """
+    record_postings([
+        (transaction_type, status, None, count, total)
+        for transaction_type, status, count, total in postings
+    ])
+
+@receiver(post_save, sender=Transaction)
+@receiver(ledger.posted)
+def bump_ledger_generation(sender, **kwargs):
+    """
+    Invalidate cached views that read live ledger data (wallet balances, today's daily stats)
+    whenever a posting commits, whichever path wrote it.
+    """
+    bump_generation_on_commit(LEDGER)
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_generation(sender, update_fields=None, **kwargs):
+    """
+    Invalidate cached catalog data and analytics on any product or category change (save, delete, pause, play).
+    - Counter-only saves (sales) are skipped: no cached catalog view shows them, and
+      purchases would otherwise flush the shop catalog cache on every sale.
+    """
+    if update_fields and set(update_fields) <= COUNTER_FIELDS:
+        return
+    bump_generation_on_commit(CATALOG)
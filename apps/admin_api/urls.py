@@ -1,6 +1,6 @@
 # apps/admin_api/urls.py
 from django.urls import path
-from .views import AdminLoginView, AdminProfileView, LogoutView, AdminPasswordChangeView, AdminOtpVerifyView, ResendAdminOtpView, StudentManagementListView, ExportStudentsView, StudentStatusUpdateView, StudentDeleteView, GrantCoinsView, CurrencyStatsView, AllocateCoinsView, AllocationHistoryView, TransactionHistoryView, CategoryListCreateView, CategoryPauseView, CategoryPlayView, CategoryDeleteView, ProductListCreateView, ProductUpdateView, ProductPauseView, ProductPlayView, ProductDeleteView, TopPurchasingProductsView, CategoryDistributionView, CoinAnalyticsView, ProductCategoryRedemptionView, WeeklyTransactionVolumeView, TokenRefreshView
+from .views import AdminLoginView, AdminProfileView, LogoutView, AdminPasswordChangeView, AdminOtpVerifyView, ResendAdminOtpView, StudentManagementListView, ExportStudentsView, StudentStatusUpdateView, StudentDeleteView, GrantCoinsView, CurrencyStatsView, AllocateCoinsView, BulkAllocateCoinsView, RewardRuleListCreateView, RewardRuleRunView, AllocationHistoryView, TransactionHistoryView, LedgerExportView, CategoryListCreateView, CategoryPauseView, CategoryPlayView, CategoryDeleteView, ProductListCreateView, ProductImportView, ProductUpdateView, ProductPauseView, ProductPlayView, ProductDeleteView, TopPurchasingProductsView, CategoryDistributionView, CoinAnalyticsView, ProductCategoryRedemptionView, WeeklyTransactionVolumeView, TokenRefreshView
 
 urlpatterns = [
     path('login/', AdminLoginView.as_view(), name='admin_login'),
@@ -17,13 +17,18 @@ urlpatterns = [
     path('grant-coins/', GrantCoinsView.as_view(), name='grant_coins'),
     path('currency-stats/', CurrencyStatsView.as_view(), name='currency_stats'),
     path('allocate-coins/', AllocateCoinsView.as_view(), name='allocate_coins'),
+    path('allocate-coins/bulk/', BulkAllocateCoinsView.as_view(), name='bulk_allocate_coins'),
+    path('reward-rules/', RewardRuleListCreateView.as_view(), name='reward-rule-list-create'),
+    path('reward-rules/<int:pk>/run/', RewardRuleRunView.as_view(), name='reward-rule-run'),
     path('allocation-history/', AllocationHistoryView.as_view(), name='allocation_history'),
     path('transaction-history/', TransactionHistoryView.as_view(), name='transaction_history'),
+    path('ledger-export/', LedgerExportView.as_view(), name='ledger_export'),
     path('categories/', CategoryListCreateView.as_view(), name='category-list-create'),
     path('categories/<int:pk>/pause/', CategoryPauseView.as_view(), name='category-pause'),
     path('categories/<int:pk>/play/', CategoryPlayView.as_view(), name='category-play'),
     path('categories/<int:pk>/', CategoryDeleteView.as_view(), name='category-delete'),
     path('products/', ProductListCreateView.as_view(), name='product-list-create'),
+    path('products/import/', ProductImportView.as_view(), name='product-import'),
     path('products/<int:pk>/edit/', ProductUpdateView.as_view(), name='product-update'),
     path('products/<int:pk>/pause/', ProductPauseView.as_view(), name='product-pause'),
     path('products/<int:pk>/play/', ProductPlayView.as_view(), name='product-play'),
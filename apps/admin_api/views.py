@@ -5,25 +5,35 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
 from rest_framework_simplejwt.exceptions import TokenError
-from .serializers import AdminLoginSerializer, AdminProfileSerializer, AdminPasswordSerializer, AdminOtpVerifySerializer, StudentManagementSerializer, GrantCoinsSerializer, ExportStudentSerializer, AllocateCoinsSerializer, AllocationHistorySerializer, CurrencyStatsSerializer, TransactionHistorySerializer, CategorySerializer, ProductSerializer
+from .serializers import AdminLoginSerializer, AdminProfileSerializer, AdminPasswordSerializer, AdminOtpVerifySerializer, StudentManagementSerializer, GrantCoinsSerializer, AllocateCoinsSerializer, BulkAllocateCoinsSerializer, RewardRuleSerializer, RewardRuleRunSerializer, AllocationHistorySerializer, CurrencyStatsSerializer, TransactionHistorySerializer, LedgerExportSerializer, AnalyticsPeriodSerializer, CategorySerializer, ProductSerializer, ProductImportSerializer
 from apps.users.models import User
 from apps.raw.models import Wallet, Transaction
-from apps.admin_api.models import Category, Product, Admin
+from apps.raw import ledger
+from apps.raw.idempotency import idempotent
+from apps.admin_api.models import Category, Product, Admin, RewardRule, ProductRanking, with_item_counts
 from django.utils import timezone
 from decimal import Decimal
 from .permissions import IsSuperuser
 import csv
-from django.http import HttpResponse, StreamingHttpResponse
-from io import StringIO
+from io import TextIOWrapper
 from django.db.models import Sum, Count
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q
+from apps.raw.pagination import CursorOnRequestPagination, EstimatedCountKeysetPagination
+from apps.raw.serializers import MediaUploadSerializer
+from rest_framework.fields import DateTimeField
+from .caching import LEDGER, ROLLUP, CATALOG, cached_response
+from .analytics import RANKING_SIZE, RANKING_WINDOWS, daily_stats
+from .exports import EXPORT_CHUNK_SIZE, csv_chunks, streaming_export, wants_gzip, ledger_queryset, ledger_rows, ledger_chunks
+from .search import search_products
+from .counters import with_sales
+from .imports import ImportFileError, read_import_file, import_products
+from django.db.models import Q, OuterRef, Subquery
+from django.db.models.functions import Coalesce, TruncWeek
 import calendar
 from calendar import month_name
-from datetime import datetime, timedelta
+from datetime import timedelta
 from django.core.mail import send_mail
 from django.conf import settings
-import pytz  # Added for timezone handling
 
 class AdminLoginView(generics.GenericAPIView):
     serializer_class = AdminLoginSerializer
@@ -137,6 +147,8 @@ class AdminProfileView(generics.RetrieveUpdateAPIView):
     Retrieve and update the current admin's profile information.
     - GET: Fetch the admin's profile.
     - PATCH: Update profile details (name, phone, location, department, bio, profile picture).
+      A new picture is uploaded in the background: the response lists it under 'uploads' as
+      PENDING, and profile_picture changes once it is DONE (poll /api/raw/uploads/<id>/).
     - Only accessible to the logged-in admin (is_superuser=True).
     """
     permission_classes = [IsSuperuser]
@@ -153,8 +165,10 @@ class AdminProfileView(generics.RetrieveUpdateAPIView):
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
-        # Return the updated serialized data
-        return Response(serializer.data)
+        # Return the updated serialized data, plus the state of a new picture's background upload
+        data = dict(serializer.data)
+        data['uploads'] = MediaUploadSerializer(serializer.uploads, many=True).data
+        return Response(data)
 
 class AdminPasswordChangeView(generics.GenericAPIView):
     """
@@ -177,6 +191,7 @@ class GrantCoinsView(generics.GenericAPIView):
     permission_classes = [IsSuperuser]
     serializer_class = GrantCoinsSerializer
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -189,11 +204,10 @@ class GrantCoinsView(generics.GenericAPIView):
             if not wallet:
                 wallet = Wallet.objects.create(user=user, boiya_id=f"BOIYA{user.id:06d}")
 
-            wallet.add_coins(amount)
-            Transaction.objects.create(
-                wallet=wallet,
-                amount=amount,
-                transaction_type='ADMIN_GRANT',
+            ledger.credit(
+                wallet,
+                amount,
+                'ADMIN_GRANT',
                 status='COMPLETED',
                 description=f'Coins granted by admin {request.user.username}'
             )
@@ -206,66 +220,96 @@ class GrantCoinsView(generics.GenericAPIView):
         except User.DoesNotExist:
             return Response({"detail": "User not found or is an admin."}, status=status.HTTP_404_NOT_FOUND)
 
+P2P_TRANSACTION_TYPES = ['TRANSFER_SEND', 'TRANSFER_RECEIVE']
+
+def annotate_student_rows(queryset):
+    """
+    Adds what the student serializers read, so a page of students costs one query.
+    - wallet is joined (balance, boiya_id).
+    - p2p_transactions is a correlated COUNT subquery served by the wallet index on Transaction.
+    """
+    p2p_count = Transaction.objects.filter(
+        wallet=OuterRef('wallet'),
+        transaction_type__in=P2P_TRANSACTION_TYPES
+    ).order_by().values('wallet').annotate(total=Count('id')).values('total')
+    return queryset.select_related('wallet').annotate(
+        p2p_transactions=Coalesce(Subquery(p2p_count), 0)
+    )
+
+class StudentPagination(PageNumberPagination):
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
 class StudentManagementListView(generics.ListAPIView):
+    """
+    Paginated student list with headline counts.
+    - Fixed query budget: page count, page rows (with annotated P2P count) and one conditional aggregate.
+    """
     serializer_class = StudentManagementSerializer
     permission_classes = [IsSuperuser]
-    queryset = User.objects.filter(is_staff=False).order_by('-date_joined').prefetch_related('wallet__transactions')
+    pagination_class = StudentPagination
+    queryset = User.objects.filter(is_staff=False).order_by('-date_joined', '-id')
 
     def get_queryset(self):
         queryset = super().get_queryset()
         search_query = self.request.query_params.get('search', None)
         if search_query:
             queryset = queryset.filter(
-                username__icontains=search_query
-            ) | queryset.filter(
-                email__icontains=search_query
+                Q(username__icontains=search_query) | Q(email__icontains=search_query)
             )
-        return queryset
+        return annotate_student_rows(queryset)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-
-        print("Serializer data:", serializer.data)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
 
-        total_students = User.objects.filter(is_staff=False).count()
-        active_students = User.objects.filter(is_staff=False, is_active=True).count()
-        blocked_students = User.objects.filter(is_staff=False, is_active=False).count()
+        counts = User.objects.filter(is_staff=False).aggregate(
+            total_students=Count('id'),
+            active_students=Count('id', filter=Q(is_active=True)),
+            blocked_students=Count('id', filter=Q(is_active=False)),
+        )
 
         response_data = {
+            "count": self.paginator.page.paginator.count,
+            "next": self.paginator.get_next_link(),
+            "previous": self.paginator.get_previous_link(),
             "students": serializer.data,
-            "counts": {
-                "total_students": total_students,
-                "active_students": active_students,
-                "blocked_students": blocked_students
-            }
+            "counts": counts
         }
         return Response(response_data)
 
 class ExportStudentsView(generics.GenericAPIView):
+    """
+    Streams all students as CSV.
+    - Rows come from a server-side cursor in chunks, with balance and P2P count annotated in the same query.
+    - Memory stays flat and the header is sent before the first row is fetched.
+    - ?gzip=1 returns students_export.csv.gz.
+    """
     permission_classes = [IsSuperuser]
- 
+
     def get(self, request, *args, **kwargs):
-        students = User.objects.filter(is_staff=False).order_by('-date_joined').prefetch_related('wallet__transactions')
-        serializer = ExportStudentSerializer(students, many=True)
- 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="students_export.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['username', 'email', 'date_joined', 'is_active', 'balance', 'boiya_id', 'transactions'])
- 
-        for student_data in serializer.data:
-            writer.writerow([
-                student_data.get('username', ''),
-                student_data.get('email', ''),
-                student_data.get('date_joined', ''),
-                student_data.get('is_active', ''),
-                student_data.get('balance', '0.00'),
-                student_data.get('boiya_id', ''),
-                student_data.get('transactions', 0)
-            ])
- 
-        return response
+        students = annotate_student_rows(
+            User.objects.filter(is_staff=False).order_by('-date_joined', '-id')
+        ).values_list(
+            'username', 'email', 'date_joined', 'is_active', 'wallet__balance', 'wallet__boiya_id', 'p2p_transactions'
+        )
+        date_field = DateTimeField()
+
+        def rows():
+            for username, email, date_joined, is_active, balance, boiya_id, transactions in students.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+                yield [
+                    username,
+                    email,
+                    date_field.to_representation(date_joined),
+                    is_active,
+                    balance if balance is not None else '0.00',
+                    boiya_id or '',
+                    transactions,
+                ]
+
+        header = ['username', 'email', 'date_joined', 'is_active', 'balance', 'boiya_id', 'transactions']
+        return streaming_export(csv_chunks(header, rows()), 'students_export.csv', 'text/csv', gzip=wants_gzip(request))
 
 class StudentStatusUpdateView(generics.UpdateAPIView):
     serializer_class = StudentManagementSerializer
@@ -297,17 +341,15 @@ class CurrencyStatsView(generics.GenericAPIView):
     permission_classes = [IsSuperuser]
     serializer_class = CurrencyStatsSerializer
 
+    @cached_response(LEDGER)  # the daily rollup and the balances move together with every posting
     def get(self, request, *args, **kwargs):
-        # Total Coins Issued: Sum of ADMIN_GRANT transactions
-        total_coins_issued = Transaction.objects.filter(
-            transaction_type='ADMIN_GRANT'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-        # Coins Redeemed: 0 for now (pending shop implementation)
-        coins_redeemed = Transaction.objects.filter(
-            transaction_type='SHOP_REDEMPTION',
-            status='COMPLETED'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        # Total Coins Issued (ADMIN_GRANT) and Coins Redeemed (completed SHOP_REDEMPTION), from the daily rollup
+        totals = daily_stats().aggregate(
+            issued=Sum('total', filter=Q(transaction_type='ADMIN_GRANT')),
+            redeemed=Sum('total', filter=Q(transaction_type='SHOP_REDEMPTION', status='COMPLETED')),
+        )
+        total_coins_issued = totals['issued'] or Decimal('0.00')
+        coins_redeemed = totals['redeemed'] or Decimal('0.00')
 
         # Active Balance: Sum of all non-admin user wallet balances
         active_balance = Wallet.objects.filter(
@@ -330,6 +372,7 @@ class AllocateCoinsView(generics.GenericAPIView):
         users = User.objects.filter(is_staff=False).values('id', 'username')
         return Response({"users": list(users)})
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -343,11 +386,10 @@ class AllocateCoinsView(generics.GenericAPIView):
             if not wallet:
                 wallet = Wallet.objects.create(user=user, boiya_id=f"BOIYA{user.id:06d}")
 
-            wallet.add_coins(amount)
-            Transaction.objects.create(
-                wallet=wallet,
-                amount=amount,
-                transaction_type='ADMIN_GRANT',
+            ledger.credit(
+                wallet,
+                amount,
+                'ADMIN_GRANT',
                 status='COMPLETED',
                 description=reason
             )
@@ -360,6 +402,122 @@ class AllocateCoinsView(generics.GenericAPIView):
         except User.DoesNotExist:
             return Response({"detail": "User not found or is an admin."}, status=status.HTTP_404_NOT_FOUND)
 
+class BulkAllocateCoinsView(generics.GenericAPIView):
+    """
+    Allocate coins to many students in one request.
+    - POST JSON: {"allocations": [{"user_id": 1, "amount": "10.00", "reason": "..."}, ...]}
+    - POST multipart: 'file' holding a CSV with user_id, amount and reason columns.
+    - The batch is all-or-nothing: if any row is invalid nothing is credited.
+    - Returns a per-row result with the student's new balance.
+    """
+    permission_classes = [IsSuperuser]
+    serializer_class = BulkAllocateCoinsSerializer
+
+    def get_rows(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return request.data.get('allocations', []) if hasattr(request.data, 'get') else request.data
+        reader = csv.DictReader(TextIOWrapper(upload, encoding='utf-8-sig'))
+        return [
+            {key.strip(): (value or '').strip() for key, value in row.items() if key}
+            for row in reader
+        ]
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        try:
+            rows = self.get_rows(request)
+        except (UnicodeDecodeError, csv.Error):
+            return Response({"detail": "Could not read the CSV file."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(data={'allocations': rows})
+        serializer.is_valid(raise_exception=True)
+        allocations = serializer.validated_data['allocations']
+
+        # One query resolves every student in the batch
+        wallets = {
+            user_id: (wallet_id, username)
+            for user_id, wallet_id, username in Wallet.objects.filter(
+                user_id__in={row['user_id'] for row in allocations},
+                user__is_staff=False
+            ).values_list('user_id', 'id', 'user__username')
+        }
+        if any(row['user_id'] not in wallets for row in allocations):
+            results = [
+                {
+                    "row": index,
+                    "user_id": row['user_id'],
+                    "status": "not_applied" if row['user_id'] in wallets else "error",
+                    "error": None if row['user_id'] in wallets else "User not found or is an admin."
+                } for index, row in enumerate(allocations, start=1)
+            ]
+            return Response({
+                "detail": "No coins were allocated because some rows are invalid.",
+                "results": results
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        balances = ledger.bulk_credit(
+            [(wallets[row['user_id']][0], row['amount'], row['reason']) for row in allocations],
+            'ADMIN_GRANT'
+        )
+        total = sum((row['amount'] for row in allocations), Decimal('0.00'))
+        results = [
+            {
+                "row": index,
+                "user_id": row['user_id'],
+                "username": wallets[row['user_id']][1],
+                "amount": str(row['amount']),
+                "status": "credited",
+                "user_balance": str(balances[wallets[row['user_id']][0]])
+            } for index, row in enumerate(allocations, start=1)
+        ]
+        return Response({
+            "detail": f"Allocated {total} coins across {len(allocations)} rows",
+            "results": results
+        }, status=status.HTTP_200_OK)
+
+class RewardRuleListCreateView(generics.ListCreateAPIView):
+    """
+    List reward rules or create a new one.
+    - A rule selects students by grade, is_active, last_activity and date_joined.
+    """
+    permission_classes = [IsSuperuser]
+    serializer_class = RewardRuleSerializer
+    queryset = RewardRule.objects.all().order_by('-created_at')
+
+class RewardRuleRunView(generics.GenericAPIView):
+    """
+    Run a reward rule.
+    - POST {"dry_run": true}: returns the matched student count and total coin cost without crediting.
+    - POST {}: credits every matching student in one set-based update and records ADMIN_GRANT rows.
+    """
+    permission_classes = [IsSuperuser]
+    serializer_class = RewardRuleRunSerializer
+    queryset = RewardRule.objects.all()
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        rule = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        wallets = Wallet.objects.filter(user__in=rule.matching_students())
+
+        if serializer.validated_data['dry_run']:
+            matched = wallets.count()
+            return Response({
+                "dry_run": True,
+                "matched": matched,
+                "total_cost": str(rule.amount * matched)
+            }, status=status.HTTP_200_OK)
+
+        credited = ledger.credit_matching(wallets, rule.amount, 'ADMIN_GRANT', description=rule.reason)
+        RewardRule.objects.filter(pk=rule.pk).update(last_run_at=timezone.now(), last_run_count=credited)
+        return Response({
+            "detail": f"Rule '{rule.name}' granted {rule.amount} coins to {credited} students",
+            "dry_run": False,
+            "matched": credited,
+            "total_cost": str(rule.amount * credited)
+        }, status=status.HTTP_200_OK)
+
 class AllocationHistoryView(generics.ListAPIView):
     permission_classes = [IsSuperuser]
     serializer_class = AllocationHistorySerializer
@@ -368,21 +526,58 @@ class AllocationHistoryView(generics.ListAPIView):
         # Define queryset dynamically per request
         return Transaction.objects.filter(transaction_type='ADMIN_GRANT').order_by('-created_at')
 
+class LedgerExportView(generics.GenericAPIView):
+    """
+    Streams the raw Transaction ledger for audits, oldest first.
+    - ?from=YYYY-MM-DD&to=YYYY-MM-DD (inclusive), ?type=... and ?status=... (repeatable or comma-separated).
+    - ?file_format=csv|ndjson, ?gzip=1 for a compressed download.
+    - Rows are read in keyset chunks with usernames joined, so memory stays flat for any ledger size.
+    """
+    permission_classes = [IsSuperuser]
+
+    def get(self, request, *args, **kwargs):
+        serializer = LedgerExportSerializer.from_query_params(request.query_params)
+        serializer.is_valid(raise_exception=True)
+        filters = serializer.validated_data
+        rows = ledger_rows(ledger_queryset(
+            start=filters.get('start'),
+            end=filters.get('end'),
+            types=filters.get('types'),
+            statuses=filters.get('statuses'),
+        ))
+        file_format = filters['file_format']
+        content_type = 'application/x-ndjson' if file_format == 'ndjson' else 'text/csv'
+        return streaming_export(ledger_chunks(rows, file_format), f'ledger_export.{file_format}', content_type, gzip=filters['gzip'])
+
 class CustomPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+class TransactionHistoryKeysetPagination(EstimatedCountKeysetPagination):
+    page_size = 10
+    max_page_size = 100
+
+class TransactionHistoryPagination(CursorOnRequestPagination):
+    page_number_class = CustomPagination
+    keyset_class = TransactionHistoryKeysetPagination
+
 class TransactionHistoryView(generics.ListAPIView):
+    """
+    Admin view of P2P and shop transactions, newest first.
+    - Paginated by ?page= as before.
+    - Cursor mode (?cursor= to start, then follow 'next'): no OFFSET scan for deep pages, and 'count'
+      is a planner estimate, so no COUNT(*) runs over the ledger.
+    """
     permission_classes = [IsSuperuser]
     serializer_class = TransactionHistorySerializer
-    pagination_class = CustomPagination
+    pagination_class = TransactionHistoryPagination
 
     def get_queryset(self):
         # Base queryset for all relevant transactions
         queryset = Transaction.objects.filter(
             transaction_type__in=['TRANSFER_SEND', 'TRANSFER_RECEIVE', 'SHOP_REDEMPTION']
-        ).order_by('-created_at')
+        ).select_related('wallet__user', 'recipient_wallet__user').order_by('-created_at', '-id')
         # Search by from or to username
         search_query = self.request.query_params.get('search', '').lower()
         if search_query:
@@ -412,7 +607,7 @@ class CategoryListCreateView(generics.ListCreateAPIView):
     """
     permission_classes = [IsSuperuser]
     serializer_class = CategorySerializer
-    queryset = Category.objects.all()
+    queryset = with_item_counts(Category.objects.all())
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -428,7 +623,7 @@ class CategoryPauseView(generics.UpdateAPIView):
     """
     permission_classes = [IsSuperuser]
     serializer_class = CategorySerializer
-    queryset = Category.objects.all()
+    queryset = with_item_counts(Category.objects.all())
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -444,7 +639,7 @@ class CategoryPlayView(generics.UpdateAPIView):
     """
     permission_classes = [IsSuperuser]
     serializer_class = CategorySerializer
-    queryset = Category.objects.all()
+    queryset = with_item_counts(Category.objects.all())
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -461,7 +656,7 @@ class CategoryDeleteView(generics.DestroyAPIView):
     - Fails if item_count > 0.
     """
     permission_classes = [IsSuperuser]
-    queryset = Category.objects.all()
+    queryset = with_item_counts(Category.objects.all())
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -475,22 +670,92 @@ class ProductListCreateView(generics.ListCreateAPIView):
     List all products or create a new product.
     - Requires admin authentication.
     - POST requires 'name', 'description', 'price', 'category', and optional 'thumbnail' and 'file'.
+      Files are uploaded in the background and listed under 'uploads'; see ProductSerializer.
+    - GET searches name and description if 'q' is provided (e.g., ?q=maths), best matches first.
     """
     permission_classes = [IsSuperuser]
     serializer_class = ProductSerializer
     queryset = Product.objects.all()
 
+    def get_queryset(self):
+        return search_products(with_sales(super().get_queryset()), self.request.query_params.get('q'))
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        return Response({"message": "Product created", "data": serializer.data}, status=status.HTTP_201_CREATED)
+        return Response({
+            "message": "Product created",
+            "data": serializer.data,
+            "uploads": MediaUploadSerializer(serializer.uploads, many=True).data
+        }, status=status.HTTP_201_CREATED)
+
+class ProductImportView(generics.GenericAPIView):
+    """
+    Create many products in one request.
+    - POST multipart: 'file' holding a CSV, or a ZIP with one CSV plus the thumbnails and files it
+      references; optional 'create_categories' and 'dry_run' flags.
+    - CSV columns: name, description, price, category (name or id), paused, thumbnail, file,
+      thumbnail_url, file_url. thumbnail / file are paths inside the ZIP.
+    - The import is all-or-nothing: if any row, category or upload fails nothing is created.
+    - Media uploads run in parallel; see apps/admin_api/imports.py.
+    """
+    permission_classes = [IsSuperuser]
+    serializer_class = ProductImportSerializer
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"detail": "Upload a CSV or ZIP file as 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows, media = read_import_file(upload)
+        except ImportFileError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(data={
+            'products': rows,
+            'create_categories': request.data.get('create_categories', False),
+            'dry_run': request.data.get('dry_run', False),
+        })
+        serializer.is_valid(raise_exception=True)
+        products = serializer.validated_data['products']
+
+        created, errors = import_products(
+            products,
+            media,
+            create_missing=serializer.validated_data['create_categories'],
+            dry_run=serializer.validated_data['dry_run'],
+        )
+        if errors:
+            results = [
+                {
+                    "row": index,
+                    "name": row['name'],
+                    "status": "error" if index in errors else "not_imported",
+                    "error": errors.get(index)
+                } for index, row in enumerate(products, start=1)
+            ]
+            return Response({
+                "detail": "No products were imported because some rows are invalid.",
+                "results": results
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if serializer.validated_data['dry_run']:
+            return Response({"detail": f"{len(products)} rows are valid; nothing was imported (dry run)."})
+
+        results = [
+            {"row": index, "id": product.id, "name": product.name, "status": "created"}
+            for index, product in enumerate(created, start=1)
+        ]
+        return Response({
+            "detail": f"Imported {len(created)} products",
+            "results": results
+        }, status=status.HTTP_201_CREATED)
 
 class ProductUpdateView(generics.UpdateAPIView):
     """
     Update an existing product.
     - Requires admin authentication.
-    - PATCH allows editing all fields, including category and date_submitted, with optional file uploads.
+    - PATCH allows editing all fields, including category and date_submitted, with optional file uploads
+      (uploaded in the background and listed under 'uploads').
     """
     permission_classes = [IsSuperuser]
     serializer_class = ProductSerializer
@@ -501,7 +766,11 @@ class ProductUpdateView(generics.UpdateAPIView):
         serializer = self.get_serializer(instance, data=request.data, partial=True, context={'request': request})
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
-        return Response({"message": "Product updated", "data": serializer.data})
+        return Response({
+            "message": "Product updated",
+            "data": serializer.data,
+            "uploads": MediaUploadSerializer(serializer.uploads, many=True).data
+        })
 
 class ProductPauseView(generics.UpdateAPIView):
     """
@@ -541,39 +810,45 @@ class ProductDeleteView(generics.DestroyAPIView):
     """
     Delete a product.
     - Requires admin authentication.
-    - Decrements category item_count upon deletion.
+    - The category's item_count is derived, so nothing else needs updating.
     """
     permission_classes = [IsSuperuser]
     queryset = Product.objects.all()
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.category.item_count -= 1
-        instance.category.save(update_fields=['item_count'])
         self.perform_destroy(instance)
         return Response({"message": "Product deleted"}, status=status.HTTP_200_OK)
 
-class TopPurchasingProductsView(generics.ListAPIView):
+class TopPurchasingProductsView(generics.GenericAPIView):
     """
-    List the top purchasing products based on sales count.
-    - Shows the top products with their category and sales.
-    - Limited to 5 items by default.
+    List the top purchasing products for a time window.
+    - ?window=7d|30d|all (default all) and ?limit=N (default 5, max 100).
+    - Served from the precomputed ProductRanking with categories joined: one query whatever the catalog size.
     """
     permission_classes = [IsSuperuser]
-    serializer_class = ProductSerializer
+    default_limit = 5
 
-    def get_queryset(self):
-        return Product.objects.all().order_by('-sales')[:2]
+    @cached_response(ROLLUP, CATALOG)
+    def get(self, request, *args, **kwargs):
+        window = request.query_params.get('window', 'all')
+        if window not in RANKING_WINDOWS:
+            return Response({"detail": f"window must be one of: {', '.join(RANKING_WINDOWS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, RANKING_SIZE))
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        ranking = ProductRanking.objects.filter(window=window).select_related('product__category').order_by('rank')[:limit]
         data = [
             {
-                "name": item['name'],
-                "category": Category.objects.get(id=item['category']).name if item['category'] else 'Uncategorized',
-                "sales": item['sales']
-            } for item in serializer.data
+                "id": entry.product_id,
+                "name": entry.product.name,
+                "category": entry.product.category.name,
+                "sales": entry.sales,
+                "coins": float(entry.coins)
+            } for entry in ranking
         ]
         return Response(data)
 
@@ -584,6 +859,7 @@ class CategoryDistributionView(generics.GenericAPIView):
     """
     permission_classes = [IsSuperuser]
 
+    @cached_response(CATALOG)
     def get(self, request, *args, **kwargs):
         total_products = Product.objects.count()
         category_stats = Category.objects.annotate(
@@ -602,10 +878,11 @@ class CoinAnalyticsView(generics.GenericAPIView):
     Provide analytics on coins issued vs coins spent per month.
     - Coins issued: Total coins allocated by admin via AllocateCoinsView (ADMIN_GRANT).
     - Coins spent: Total coins spent on product purchases via PurchaseView.
-    - Data is aggregated monthly for the current year.
+    - Data is aggregated monthly for the current year from the TransactionDailyStats rollup.
     """
     permission_classes = [IsSuperuser]
 
+    @cached_response(LEDGER)
     def get(self, request, *args, **kwargs):
         # Get all months (1-12) with their names
         months = [month_name[i] for i in range(1, 13)]
@@ -614,23 +891,15 @@ class CoinAnalyticsView(generics.GenericAPIView):
         # Initialize data structure
         analytics_data = {month: {"issued": Decimal('0.00'), "spent": Decimal('0.00')} for month in months}
 
-        # Coins issued (from AllocateCoinsView transactions)
-        allocation_transactions = Transaction.objects.filter(
-            transaction_type='ADMIN_GRANT',
-            created_at__year=current_year
-        ).values('created_at__month').annotate(total_issued=Sum('amount'))
-        for entry in allocation_transactions:
-            month = months[entry['created_at__month'] - 1]
-            analytics_data[month]["issued"] += entry['total_issued'] or Decimal('0.00')
-
-        # Coins spent (from PurchaseView transactions)
-        purchase_transactions = Transaction.objects.filter(
-            transaction_type='SHOP_REDEMPTION',
-            created_at__year=current_year
-        ).values('created_at__month').annotate(total_spent=Sum('amount'))
-        for entry in purchase_transactions:
-            month = months[entry['created_at__month'] - 1]
-            analytics_data[month]["spent"] += entry['total_spent'] or Decimal('0.00')
+        # Coins issued (ADMIN_GRANT) and spent (SHOP_REDEMPTION) per month
+        monthly_totals = daily_stats(
+            day__year=current_year,
+            transaction_type__in=['ADMIN_GRANT', 'SHOP_REDEMPTION']
+        ).values('day__month', 'transaction_type').annotate(month_total=Sum('total'))
+        for entry in monthly_totals:
+            month = months[entry['day__month'] - 1]
+            key = "issued" if entry['transaction_type'] == 'ADMIN_GRANT' else "spent"
+            analytics_data[month][key] += entry['month_total'] or Decimal('0.00')
 
         # Convert to list of dictionaries for response
         response_data = [
@@ -648,31 +917,37 @@ class ProductCategoryRedemptionView(generics.GenericAPIView):
     Provide analytics on how students spend their coins across store categories.
     - Calculates the percentage of total coins spent per category based on product sales.
     - Includes an 'Other' category for categories with less than 5% contribution.
+    - Redemptions whose category is unknown are reported as 'Uncategorized'; products deleted since
+      the purchase still count under the category they had when it was recorded.
+    - Period: ?month=YYYY-MM or ?from=YYYY-MM-DD&to=YYYY-MM-DD; defaults to the current year.
+    - One query: the SHOP_REDEMPTION rollup grouped by category and joined to its name.
     """
     permission_classes = [IsSuperuser]
 
+    @cached_response(LEDGER, CATALOG)
     def get(self, request, *args, **kwargs):
-        current_year = timezone.now().year  # 2025
-
-        # Aggregate total coins spent per category via SHOP_REDEMPTION transactions
-        category_spending = Transaction.objects.filter(
-            transaction_type='SHOP_REDEMPTION',
-            created_at__year=current_year
-        ).values('product_id').annotate(total_spent=Sum('amount')).values('product_id', 'total_spent')
+        serializer = AnalyticsPeriodSerializer.from_query_params(request.query_params)
+        serializer.is_valid(raise_exception=True)
+        first_day = serializer.validated_data.get('start')
+        last_day = serializer.validated_data.get('end')
+        if not first_day:
+            today = timezone.localdate()
+            first_day = today.replace(month=1, day=1)
+            last_day = today.replace(month=12, day=31)
+
+        # Aggregate total coins spent per category from the SHOP_REDEMPTION rollup
+        category_spending = daily_stats(
+            first_day, last_day,
+            transaction_type='SHOP_REDEMPTION'
+        ).values('category__name').annotate(total_spent=Sum('total')).order_by('-total_spent')
 
-        # Map product IDs to categories and sum spending
         category_totals = {}
         total_spent = Decimal('0.00')
-        for transaction in category_spending:
-            product_id = transaction['product_id']
-            if product_id:  # Ensure product_id exists
-                try:
-                    product = Product.objects.get(id=product_id)
-                    category_name = product.category.name if product.category else 'Uncategorized'
-                    category_totals[category_name] = category_totals.get(category_name, Decimal('0.00')) + transaction['total_spent']
-                    total_spent += transaction['total_spent']
-                except Product.DoesNotExist:
-                    continue
+        for entry in category_spending:
+            # No category: the product (or its category) was gone when the purchase was recorded or since
+            category_name = entry['category__name'] or 'Uncategorized'
+            category_totals[category_name] = category_totals.get(category_name, Decimal('0.00')) + entry['total_spent']
+            total_spent += entry['total_spent']
 
         # Calculate percentages
         category_percentages = {}
@@ -687,7 +962,7 @@ class ProductCategoryRedemptionView(generics.GenericAPIView):
             if percentage >= 5:
                 main_categories[category] = percentage
             else:
-                other_total += amount
+                other_total += category_totals[category]
 
         if other_total > 0 and total_spent > 0:
             other_percentage = (other_total / total_spent * 100)
@@ -707,62 +982,52 @@ class WeeklyTransactionVolumeView(generics.GenericAPIView):
     Provide analytics on weekly transaction volume based on month-based weeks.
     - Marketplace: Total coins spent on SHOP_REDEMPTION transactions.
     - P2P: Total coins sent on TRANSFER_SEND transactions.
-    - Data is aggregated over the weeks of the current month, with weeks defined from the 1st to Sundays.
+    - Weeks run Monday to Sunday, clipped to the period, so W1 runs from the first day to the first Sunday.
+    - Period: ?month=YYYY-MM or ?from=YYYY-MM-DD&to=YYYY-MM-DD; defaults to the current month.
     - Only includes status='COMPLETED' transactions.
-    - Supports any month length (28, 30, or 31 days).
+    - One grouped query over the daily rollup, whatever the period length.
     """
     permission_classes = [IsSuperuser]
 
+    @cached_response(LEDGER)
     def get(self, request, *args, **kwargs):
-        today = timezone.now()
-        current_year = today.year  # 2025
-        current_month = today.month  # October
-        _, last_day_of_month = calendar.monthrange(current_year, current_month)  # Get actual last day (e.g., 31 for October)
-
-        # Get the first and last day of the current month with UTC timezone
-        utc = pytz.UTC
-        first_day = utc.localize(datetime(current_year, current_month, 1))
-        last_day = utc.localize(datetime(current_year, current_month, last_day_of_month, 23, 59, 59, 999999))
-
-        # Calculate week boundaries based on Sundays, including the full day
-        weeks = []
-        current_date = first_day
-        week_number = 1
-
-        while current_date.date() <= last_day.date():
-            week_start = current_date
-            # Move to the end of the week (Sunday 23:59:59) or beyond the month end
-            while current_date.weekday() != 6 and current_date <= last_day:
-                current_date += timedelta(days=1)
-            week_end = min(current_date.replace(hour=23, minute=59, second=59, microsecond=999999), last_day)
-            current_week = {
-                "week": f"W{week_number}",
-                "start": week_start,
-                "end": week_end
-            }
-            weeks.append(current_week)
-            print(f"Week {current_week['week']}: {current_week['start']} to {current_week['end']}")  # Debug output
-            current_date += timedelta(days=1)  # Move past Sunday
-            week_number += 1
+        serializer = AnalyticsPeriodSerializer.from_query_params(request.query_params)
+        serializer.is_valid(raise_exception=True)
+        first_day = serializer.validated_data.get('start')
+        last_day = serializer.validated_data.get('end')
+        if not first_day:
+            today = timezone.localdate()
+            first_day = today.replace(day=1)
+            last_day = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+
+        # Both volumes per Monday-started week in one pass over the rollup
+        weekly_totals = daily_stats(
+            first_day, last_day,
+            transaction_type__in=['SHOP_REDEMPTION', 'TRANSFER_SEND'],
+            status='COMPLETED'
+        ).annotate(week_start=TruncWeek('day')).values('week_start').annotate(
+            marketplace=Sum('total', filter=Q(transaction_type='SHOP_REDEMPTION')),
+            p2p=Sum('total', filter=Q(transaction_type='TRANSFER_SEND')),
+        )
+        volumes = {entry['week_start']: entry for entry in weekly_totals}
 
-        # Aggregate transaction data for the entire month, including all weeks
+        # Label every week of the period, including empty ones
         response_data = []
-        for week in weeks:
-            marketplace_volume = Transaction.objects.filter(
-                transaction_type='SHOP_REDEMPTION',
-                status='COMPLETED',
-                created_at__range=(week['start'], week['end'])
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-            p2p_volume = Transaction.objects.filter(
-                transaction_type='TRANSFER_SEND',
-                status='COMPLETED',
-                created_at__range=(week['start'], week['end'])
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        week_start = first_day
+        week_number = 1
+        while week_start <= last_day:
+            monday = week_start - timedelta(days=week_start.weekday())
+            week_end = min(monday + timedelta(days=6), last_day)
+            volume = volumes.get(monday, {})
             response_data.append({
-                "week": week['week'],
-                "marketplace": float(marketplace_volume),
-                "p2p": float(p2p_volume)
+                "week": f"W{week_number}",
+                "start": week_start.isoformat(),
+                "end": week_end.isoformat(),
+                "marketplace": float(volume.get('marketplace') or 0),
+                "p2p": float(volume.get('p2p') or 0)
             })
+            week_start = week_end + timedelta(days=1)
+            week_number += 1
 
         return Response(response_data)
     
\ No newline at end of file
@@ -0,0 +1,100 @@
+# apps/raw/idempotency.py
+"""
+Idempotency-Key support for money-moving endpoints.
+- A client sends the same Idempotency-Key header when retrying a POST.
+- The first request runs normally and its response is stored against (user, key).
+- A replay gets the stored response after one indexed lookup, without touching any wallet.
+- Requests without the header behave exactly as before.
+- The key is claimed in the same database transaction as the handler's writes, so a request that
+  dies halfway (timeout, OOM kill) leaves neither the key nor the money movement behind.
+- Since the handler runs inside that transaction, the ledger cannot retry a deadlock or
+  serialization failure itself; the whole transaction (claim and handler) is retried here instead.
+"""
+import functools
+import hashlib
+import json
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from .ledger import retrying
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def _lookup(user, key):
+    stored = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if stored and stored.created_at < timezone.now() - settings.IDEMPOTENCY_KEY_TTL:
+        stored.delete()
+        return None
+    return stored
+
+
+def _replay(stored, fingerprint):
+    if stored.fingerprint != fingerprint:
+        return Response(
+            {"detail": f"This {HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = Response(stored.response_body, status=stored.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim_and_run(handler, view, request, key, args, kwargs):
+    fingerprint = _fingerprint(request)
+    stored = _lookup(request.user, key)
+    if stored is not None:
+        return _replay(stored, fingerprint)
+
+    with transaction.atomic():
+        # The claim is only visible to other requests once the handler's writes commit with it
+        try:
+            with transaction.atomic():
+                stored = IdempotencyKey.objects.create(user=request.user, key=key, fingerprint=fingerprint)
+        except IntegrityError:
+            return _replay(IdempotencyKey.objects.get(user=request.user, key=key), fingerprint)
+
+        response = handler(view, request, *args, **kwargs)
+        if response.status_code >= 500:
+            transaction.set_rollback(True)
+            return response
+        if getattr(response, 'data', None) is None:
+            stored.delete()  # nothing to replay
+            return response
+
+        # Store exactly what the client receives (Decimals rendered the same way)
+        stored.response_status = response.status_code
+        stored.response_body = json.loads(JSONRenderer().render(response.data))
+        stored.save(update_fields=['response_status', 'response_body'])
+    return response
+
+
+def idempotent(handler):
+    """
+    Decorator for APIView handlers (post) that honours the Idempotency-Key header.
+    - Responses below 500 are stored and replayed; server errors roll back the key with the
+      handler's writes, so the client can retry.
+    - A concurrent duplicate waits on the unique (user, key) index until the first request
+      commits or rolls back, then gets the stored response or runs itself; it never runs twice.
+    - Deadlocks and serialization failures re-run the claim and the handler from the start, up to
+      ledger.MAX_RETRIES times.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({"detail": f"{HEADER} must be at most 255 characters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return retrying(_claim_and_run, handler, self, request, key, args, kwargs)
+    return wrapper
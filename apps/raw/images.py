@@ -0,0 +1,90 @@
+# apps/raw/images.py
+"""
+Image checks and derivatives for uploaded pictures (profile images, product thumbnails).
+- validate_image runs in the request: it checks the header, then decodes the picture (JPEGs at a
+  reduced scale), so non-images, unsupported formats, oversized and truncated files are rejected
+  before the client is told the upload was accepted.
+- make_derivatives runs in the background upload worker: it applies the EXIF orientation,
+  drops all metadata (EXIF, GPS, ICC) and re-encodes the picture once per size in IMAGE_SIZES,
+  each fitted in a size x size box and never upscaled; sizes the picture already fits share one file.
+"""
+import os
+from io import BytesIO
+from django.conf import settings
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+IMAGE_SIZES = (64, 256, 1024)  # avatar, card / list, detail
+ALLOWED_IMAGE_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+DERIVATIVE_FORMATS = {
+    # settings.IMAGE_DERIVATIVE_FORMAT: (Pillow format, extension, save options)
+    'WEBP': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'JPEG': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+class InvalidImage(ValueError):
+    """
+    The upload is not an image this pipeline accepts; the message is safe to show to the client.
+    """
+
+
+def validate_image(file):
+    """
+    Checks an uploaded file (Django UploadedFile or any seekable file object) before it is staged.
+    Raises InvalidImage; leaves the file positioned at the start.
+    """
+    size = getattr(file, 'size', None)
+    if size is None:
+        size = file.seek(0, os.SEEK_END)
+        file.seek(0)
+    if size > settings.MAX_IMAGE_UPLOAD_SIZE:
+        raise InvalidImage(f"Images must be at most {settings.MAX_IMAGE_UPLOAD_SIZE // (1024 * 1024)} MB.")
+    try:
+        with Image.open(file) as image:
+            image_format = image.format
+            width, height = image.size
+            image.verify()
+        if image_format not in ALLOWED_IMAGE_FORMATS:
+            raise InvalidImage("Upload a valid JPEG, PNG, WebP or GIF image.")
+        if width * height > settings.MAX_IMAGE_PIXELS:
+            raise InvalidImage("The image has too many pixels.")
+        # verify() does not decode JPEG data; a real decode catches truncated and corrupt files
+        file.seek(0)
+        with Image.open(file) as image:
+            image.draft('RGB', (max(IMAGE_SIZES), max(IMAGE_SIZES)))
+            image.load()
+    except InvalidImage:
+        raise
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError, ValueError):
+        raise InvalidImage("Upload a valid JPEG, PNG, WebP or GIF image.")
+    finally:
+        file.seek(0)
+
+
+def make_derivatives(file, sizes=IMAGE_SIZES):
+    """
+    Renders a validated image file in settings.IMAGE_DERIVATIVE_FORMAT.
+    Returns [(sizes, bytes, extension)], largest first: sizes lists every requested size served by that
+    file, since a picture already smaller than a box is not resized again.
+    - Sizes are rendered largest first, each from the previous one, so a 12 MP photo is only
+      resampled once at full resolution; JPEGs are decoded at a reduced scale when possible.
+    """
+    image_format, extension, options = DERIVATIVE_FORMATS[settings.IMAGE_DERIVATIVE_FORMAT]
+    largest = max(sizes)
+    derivatives = []
+    with Image.open(file) as image:
+        image.draft('RGB', (largest, largest))  # JPEG only: decode at 1/2, 1/4 or 1/8 scale if still >= largest
+        image = ImageOps.exif_transpose(image)  # apply the orientation before the EXIF block is dropped
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha and image_format == 'WEBP' else 'RGB')
+        for size in sorted(sizes, reverse=True):
+            rendered = image.size
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            if derivatives and image.size == rendered:
+                derivatives[-1][0].append(size)
+                continue
+            buffer = BytesIO()
+            # No exif / icc_profile arguments: the encoded file carries no metadata
+            image.save(buffer, image_format, **options)
+            derivatives.append(([size], buffer.getvalue(), extension))
+    return derivatives
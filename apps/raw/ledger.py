@@ -0,0 +1,444 @@
+# apps/raw/ledger.py
+"""
+Ledger service: the single entry point for every movement of coins.
+- Balances are changed with one conditional UPDATE per wallet, never read-modify-write.
+- Debits only succeed while the balance covers the amount (WHERE balance >= amount).
+- The new balance comes back from the UPDATE itself (RETURNING), so the row is not re-read.
+- Each posting writes its Transaction row in the same database transaction.
+- Every posting bumps Wallet.version in the same UPDATE, which drives the wallet ETags.
+"""
+import random
+import time
+from decimal import Decimal
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+from .models import Wallet, Transaction
+
+CENT = Decimal('0.01')
+
+# Sent for postings written with raw SQL or bulk_create, which fire no Transaction post_save.
+# Like post_save it is sent inside the posting's transaction; receivers get transaction_types and
+# postings, a list of (transaction_type, status, count, total) groups.
+posted = Signal()
+
+
+def _announce(*postings):
+    posted.send(
+        sender=Transaction,
+        transaction_types=tuple(transaction_type for transaction_type, _, _, _ in postings),
+        postings=list(postings),
+    )
+
+
+# Serialization failures and deadlocks are safe to retry: the database rolled the attempt back
+MAX_RETRIES = 3
+RETRYABLE_SQLSTATES = {'40001', '40P01'}
+
+
+class InsufficientBalance(Exception):
+    """Raised when a debit would take a wallet below zero."""
+
+
+def _is_retryable(exc):
+    cause = exc.__cause__
+    if getattr(cause, 'pgcode', None) in RETRYABLE_SQLSTATES:
+        return True
+    return 'database is locked' in str(exc)  # SQLite writer contention
+
+
+def retrying(func, *args):
+    """
+    Run a posting, retrying up to MAX_RETRIES times on serialization failures and deadlocks.
+    Inside an outer atomic block the whole transaction is already lost, so the error is raised;
+    whoever opened that block retries it (see apps/raw/idempotency.py).
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return func(*args)
+        except OperationalError as exc:
+            if attempt == MAX_RETRIES or connection.in_atomic_block or not _is_retryable(exc):
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+def _amount(amount):
+    amount = Decimal(amount)
+    if amount < 0:
+        raise ValueError("Ledger amounts cannot be negative.")
+    return amount
+
+
+def _balance(value):
+    # Postgres hands back a Decimal, SQLite a float/int; normalise both
+    return Decimal(str(value)).quantize(CENT)
+
+
+def _update_balance(sql, params):
+    table = connection.ops.quote_name(Wallet._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(table=table), params)
+        row = cursor.fetchone()
+    return _balance(row[0]) if row else None
+
+
+def credit_balance(wallet_id, amount):
+    """
+    Add amount to a wallet (balance = balance + amount) and return the new balance.
+    """
+    amount = _amount(amount)
+    return _update_balance(
+        "UPDATE {table} SET balance = balance + %s, version = version + 1 WHERE id = %s RETURNING balance",
+        [amount, wallet_id],
+    )
+
+
+def debit_balance(wallet_id, amount):
+    """
+    Remove amount from a wallet only if the balance covers it.
+    Returns the new balance, or None when the wallet had insufficient funds.
+    """
+    amount = _amount(amount)
+    return _update_balance(
+        "UPDATE {table} SET balance = balance - %s, version = version + 1 WHERE id = %s AND balance >= %s RETURNING balance",
+        [amount, wallet_id, amount],
+    )
+
+
+def credit(wallet, amount, transaction_type, **fields):
+    """
+    Credit a wallet and record the posting.
+    - Updates wallet.balance in memory with the balance returned by the database.
+    - Extra keyword arguments are passed to the Transaction row (description, product_id, ...).
+    """
+    amount = _amount(amount)
+    with transaction.atomic(savepoint=False):
+        wallet.balance = credit_balance(wallet.pk, amount)
+        return Transaction.objects.create(
+            wallet=wallet,
+            amount=amount,
+            transaction_type=transaction_type,
+            **fields
+        )
+
+
+def debit(wallet, amount, transaction_type, **fields):
+    """
+    Debit a wallet and record the posting.
+    - Raises InsufficientBalance (and writes nothing) if the balance does not cover the amount.
+    """
+    amount = _amount(amount)
+    with transaction.atomic(savepoint=False):
+        new_balance = debit_balance(wallet.pk, amount)
+        if new_balance is not None:
+            wallet.balance = new_balance
+            return Transaction.objects.create(
+                wallet=wallet,
+                amount=amount,
+                transaction_type=transaction_type,
+                **fields
+            )
+    raise InsufficientBalance()
+
+
+def record_failed(wallet, amount, transaction_type, **fields):
+    """
+    Record a FAILED posting: no coins move, but the row shows up in the wallet's history,
+    so the wallet version is bumped with it.
+    """
+    with transaction.atomic(savepoint=False):
+        Wallet.objects.filter(pk=wallet.pk).update(version=F('version') + 1)
+        return Transaction.objects.create(
+            wallet=wallet,
+            amount=amount,
+            transaction_type=transaction_type,
+            status='FAILED',
+            **fields
+        )
+
+
+# Daily bonus: the guard on last_login_bonus makes a second claim on the same day a no-op,
+# however many logins race. On PostgreSQL the DAILY_LOGIN row is inserted by the same statement.
+DAILY_BONUS_SQL = """
+WITH credited AS (
+    UPDATE {wallet} SET balance = balance + %(amount)s, last_login_bonus = %(today)s, version = version + 1
+    WHERE id = %(wallet_id)s AND last_login_bonus < %(today)s
+    RETURNING id, balance
+), posted AS (
+    INSERT INTO {transaction} (wallet_id, amount, transaction_type, status, description, created_at)
+    SELECT id, %(amount)s, 'DAILY_LOGIN', 'COMPLETED', %(description)s, %(now)s FROM credited
+    RETURNING id
+)
+SELECT credited.balance, posted.id FROM credited, posted
+"""
+DAILY_BONUS_UPDATE_SQL = """
+UPDATE {table} SET balance = balance + %s, last_login_bonus = %s, version = version + 1
+WHERE id = %s AND last_login_bonus < %s
+RETURNING balance
+"""
+
+
+def claim_daily_bonus(wallet, amount, today, description='Daily login bonus'):
+    """
+    Credit the daily login bonus at most once per day.
+    - Only wallets whose last_login_bonus is before today are credited.
+    Returns the DAILY_LOGIN Transaction, or None when today's bonus was already claimed.
+    """
+    amount = _amount(amount)
+    if connection.vendor == 'postgresql':
+        now = timezone.now()
+        sql = DAILY_BONUS_SQL.format(
+            wallet=connection.ops.quote_name(Wallet._meta.db_table),
+            transaction=connection.ops.quote_name(Transaction._meta.db_table),
+        )
+        # Atomic so posted receivers write in the same transaction as the statement
+        with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+            cursor.execute(sql, {
+                'amount': amount,
+                'today': today,
+                'wallet_id': wallet.pk,
+                'description': description,
+                'now': now,
+            })
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            _announce(('DAILY_LOGIN', 'COMPLETED', 1, amount))
+        wallet.balance, wallet.last_login_bonus = _balance(row[0]), today
+        posted = Transaction(
+            id=row[1], wallet=wallet, amount=amount, transaction_type='DAILY_LOGIN',
+            status='COMPLETED', description=description, created_at=now,
+        )
+        posted._state.adding = False
+        return posted
+
+    with transaction.atomic(savepoint=False):
+        new_balance = _update_balance(
+            DAILY_BONUS_UPDATE_SQL,
+            [amount, connection.ops.adapt_datefield_value(today), wallet.pk, connection.ops.adapt_datefield_value(today)],
+        )
+        if new_balance is None:
+            return None
+        wallet.balance, wallet.last_login_bonus = new_balance, today
+        return Transaction.objects.create(
+            wallet=wallet,
+            amount=amount,
+            transaction_type='DAILY_LOGIN',
+            status='COMPLETED',
+            description=description
+        )
+
+
+# Set-based credit for many wallets at once: one UPDATE ... FROM a VALUES list per chunk
+BULK_CREDIT_SQL = """
+WITH credits (id, amount) AS (VALUES {values})
+UPDATE {wallet} SET balance = {wallet}.balance + credits.amount, version = {wallet}.version + 1
+FROM credits
+WHERE {wallet}.id = credits.id
+RETURNING {wallet}.id, {wallet}.balance
+"""
+BULK_CHUNK_SIZE = 1000
+
+
+def bulk_credit(postings, transaction_type, status='COMPLETED'):
+    """
+    Credit many wallets in one database transaction.
+    - postings: iterable of (wallet_id, amount, description); a wallet may appear more than once.
+    - Balances move with one UPDATE per chunk of wallets, and the Transaction rows land via bulk_create.
+    - Wallets are locked and updated in id order, like transfer(), so overlapping bulk credits and
+      transfers queue up instead of deadlocking.
+    Returns {wallet_id: new_balance} for every wallet that was credited.
+    """
+    postings = [(wallet_id, _amount(amount), description) for wallet_id, amount, description in postings]
+    totals = {}
+    for wallet_id, amount, _ in postings:
+        totals[wallet_id] = totals.get(wallet_id, Decimal('0.00')) + amount
+
+    wallet_table = connection.ops.quote_name(Wallet._meta.db_table)
+    balances = {}
+    items = sorted(totals.items())
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for start in range(0, len(items), BULK_CHUNK_SIZE):
+                chunk = items[start:start + BULK_CHUNK_SIZE]
+                if connection.features.has_select_for_update:
+                    # UPDATE ... FROM locks rows in join order; take the locks in id order first
+                    list(Wallet.objects.select_for_update().filter(pk__in=[wallet_id for wallet_id, _ in chunk]).order_by('pk').values_list('pk'))
+                values = ', '.join(['(%s, %s)'] * len(chunk))
+                params = [value for pair in chunk for value in pair]
+                cursor.execute(BULK_CREDIT_SQL.format(values=values, wallet=wallet_table), params)
+                balances.update((wallet_id, _balance(balance)) for wallet_id, balance in cursor.fetchall())
+        rows = Transaction.objects.bulk_create(
+            [
+                Transaction(
+                    wallet_id=wallet_id,
+                    amount=amount,
+                    transaction_type=transaction_type,
+                    status=status,
+                    description=description,
+                )
+                for wallet_id, amount, description in postings
+                if wallet_id in balances
+            ],
+            batch_size=BULK_CHUNK_SIZE,
+        )
+        if rows:
+            _announce((transaction_type, status, len(rows), sum(row.amount for row in rows)))
+    return balances
+
+
+# Credit every wallet matched by a queryset. On PostgreSQL the UPDATE feeds the INSERT directly,
+# so the ledger rows always describe exactly the wallets that were credited. The matched wallets
+# are locked in id order first, like transfer() and bulk_credit(), so a rule run and concurrent
+# transfers queue up instead of deadlocking.
+CREDIT_MATCHING_SQL = """
+WITH locked AS (
+    SELECT id FROM {wallet}
+    WHERE id IN ({matched})
+    ORDER BY id
+    FOR UPDATE
+), credited AS (
+    UPDATE {wallet} SET balance = balance + %s, version = version + 1
+    WHERE id IN (SELECT id FROM locked)
+    RETURNING id
+)
+INSERT INTO {transaction} (wallet_id, amount, transaction_type, status, description, created_at)
+SELECT id, %s, %s, %s, %s, %s FROM credited
+"""
+CREDIT_MATCHING_UPDATE_SQL = "UPDATE {wallet} SET balance = balance + %s, version = version + 1 WHERE id IN ({matched})"
+CREDIT_MATCHING_INSERT_SQL = """
+INSERT INTO {transaction} (wallet_id, amount, transaction_type, status, description, created_at)
+SELECT id, %s, %s, %s, %s, %s FROM {wallet} WHERE id IN ({matched})
+"""
+
+
+def credit_matching(wallets, amount, transaction_type, description='', status='COMPLETED'):
+    """
+    Credit the same amount to every wallet in a queryset without loading any of them.
+    - One set-based UPDATE plus one INSERT ... SELECT, whatever the number of wallets.
+    Returns the number of wallets credited.
+    """
+    amount = _amount(amount)
+    matched, matched_params = wallets.values('id').query.sql_with_params()
+    tables = {
+        'wallet': connection.ops.quote_name(Wallet._meta.db_table),
+        'transaction': connection.ops.quote_name(Transaction._meta.db_table),
+        'matched': matched,
+    }
+    row = [
+        connection.ops.adapt_decimalfield_value(amount),
+        transaction_type,
+        status,
+        description,
+        connection.ops.adapt_datetimefield_value(timezone.now()),
+    ]
+    amount_param = connection.ops.adapt_decimalfield_value(amount)
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(CREDIT_MATCHING_SQL.format(**tables), [*matched_params, amount_param, *row])
+        else:
+            # SQLite holds its single write lock from the UPDATE until commit, so the
+            # matched set cannot change between the two statements
+            cursor.execute(CREDIT_MATCHING_UPDATE_SQL.format(**tables), [amount_param, *matched_params])
+            cursor.execute(CREDIT_MATCHING_INSERT_SQL.format(**tables), [*row, *matched_params])
+        if cursor.rowcount:
+            _announce((transaction_type, status, cursor.rowcount, amount * cursor.rowcount))
+        return cursor.rowcount
+
+
+# Debit, credit and both ledger rows in one statement; the transaction around it only adds the
+# posted receivers' writes (daily stats). Both wallet rows are locked first, in id order, so two opposite transfers between the same
+# pair queue up instead of deadlocking. The credit and the inserts only happen when the
+# guarded debit matched, so an insufficient balance changes nothing.
+TRANSFER_SQL = """
+WITH locked AS (
+    SELECT id FROM {wallet}
+    WHERE id IN (%(sender)s, %(recipient)s)
+    ORDER BY id
+    FOR UPDATE
+), debit AS (
+    UPDATE {wallet} SET balance = balance - %(amount)s, version = version + 1
+    WHERE id = %(sender)s AND balance >= %(amount)s
+      AND EXISTS (SELECT 1 FROM locked WHERE id = %(recipient)s)
+    RETURNING id, balance
+), credit AS (
+    UPDATE {wallet} SET balance = balance + %(amount)s, version = version + 1
+    WHERE id = %(recipient)s AND EXISTS (SELECT 1 FROM debit)
+    RETURNING id, balance
+), posted AS (
+    INSERT INTO {transaction} (wallet_id, recipient_wallet_id, amount, transaction_type, status, description, created_at)
+    SELECT debit.id, credit.id, %(amount)s, 'TRANSFER_SEND', 'COMPLETED', %(send_description)s, %(now)s FROM debit, credit
+    UNION ALL
+    SELECT credit.id, debit.id, %(amount)s, 'TRANSFER_RECEIVE', 'COMPLETED', %(receive_description)s, %(now)s FROM debit, credit
+    RETURNING id, transaction_type
+)
+SELECT
+    -- A debit without its credit (recipient deleted mid-statement) aborts the whole statement
+    1 / CASE WHEN EXISTS (SELECT 1 FROM debit) AND NOT EXISTS (SELECT 1 FROM credit) THEN 0 ELSE 1 END,
+    (SELECT balance FROM debit),
+    (SELECT balance FROM credit),
+    (SELECT id FROM posted WHERE transaction_type = 'TRANSFER_SEND'),
+    (SELECT id FROM posted WHERE transaction_type = 'TRANSFER_RECEIVE')
+"""
+
+
+def _transfer_single_statement(sender, recipient, amount, send_description, receive_description):
+    now = timezone.now()
+    sql = TRANSFER_SQL.format(
+        wallet=connection.ops.quote_name(Wallet._meta.db_table),
+        transaction=connection.ops.quote_name(Transaction._meta.db_table),
+    )
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        cursor.execute(sql, {
+            'amount': amount,
+            'sender': sender.pk,
+            'recipient': recipient.pk,
+            'send_description': send_description,
+            'receive_description': receive_description,
+            'now': now,
+        })
+        _, sender_balance, recipient_balance, sent_id, received_id = cursor.fetchone()
+        if sender_balance is None:
+            raise InsufficientBalance()
+        _announce(('TRANSFER_SEND', 'COMPLETED', 1, amount), ('TRANSFER_RECEIVE', 'COMPLETED', 1, amount))
+
+    sender.balance = _balance(sender_balance)
+    recipient.balance = _balance(recipient_balance)
+    sent = Transaction(
+        id=sent_id, wallet=sender, recipient_wallet=recipient, amount=amount,
+        transaction_type='TRANSFER_SEND', status='COMPLETED', description=send_description, created_at=now,
+    )
+    received = Transaction(
+        id=received_id, wallet=recipient, recipient_wallet=sender, amount=amount,
+        transaction_type='TRANSFER_RECEIVE', status='COMPLETED', description=receive_description, created_at=now,
+    )
+    sent._state.adding = received._state.adding = False
+    return sent, received
+
+
+def _transfer_statements(sender, recipient, amount, send_description, receive_description):
+    # Portable path: same postings, one statement per step inside one transaction, with both
+    # wallets locked in id order before either balance moves. SQLite has no row locks and
+    # serialises writers itself; a read first would only make its lock upgrade fail.
+    with transaction.atomic():
+        if connection.features.has_select_for_update:
+            list(Wallet.objects.select_for_update().filter(pk__in=[sender.pk, recipient.pk]).order_by('pk').values_list('pk'))
+        sent = debit(sender, amount, 'TRANSFER_SEND', recipient_wallet=recipient, description=send_description)
+        received = credit(recipient, amount, 'TRANSFER_RECEIVE', recipient_wallet=sender, description=receive_description)
+    return sent, received
+
+
+def transfer(sender, recipient, amount, send_description='', receive_description=''):
+    """
+    Move coins between two wallets as one unit of work.
+    - Writes the TRANSFER_SEND / TRANSFER_RECEIVE pair.
+    - On PostgreSQL the whole posting is a single statement (see TRANSFER_SQL).
+    - Raises InsufficientBalance if the sender cannot cover the amount.
+    Returns the (sent, received) Transaction rows.
+    """
+    amount = _amount(amount)
+    if sender.pk == recipient.pk:
+        raise ValueError("Cannot transfer to the same wallet.")
+    post = _transfer_single_statement if connection.vendor == 'postgresql' else _transfer_statements
+    return retrying(post, sender, recipient, amount, send_description, receive_description)
@@ -0,0 +1,78 @@
+# apps/raw/management/commands/bench_transfers.py
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.crypto import get_random_string
+from apps.users.models import User
+from apps.raw.models import Wallet, Transaction
+from apps.raw import ledger
+
+
+def legacy_transfer(sender, recipient_boiya_id, amount):
+    """
+    The transfer path SendView used before the ledger: recipient lookup, read-modify-write
+    saves on both wallets, two inserts and lazy user loads for the descriptions.
+    """
+    recipient = Wallet.objects.get(boiya_id=recipient_boiya_id)
+    sender.balance -= amount
+    sender.save()
+    recipient.balance += amount
+    recipient.save()
+    Transaction.objects.create(
+        wallet=sender, recipient_wallet=recipient, amount=amount, transaction_type='TRANSFER_SEND',
+        description=f'Transfer to {recipient.user.username} (Boiya ID: {recipient_boiya_id})'
+    )
+    Transaction.objects.create(
+        wallet=recipient, recipient_wallet=sender, amount=amount, transaction_type='TRANSFER_RECEIVE',
+        description=f'Transfer from {sender.user.username}'
+    )
+
+
+def ledger_transfer(sender, recipient_boiya_id, amount):
+    recipient = Wallet.objects.select_related('user').get(boiya_id=recipient_boiya_id)
+    ledger.transfer(
+        sender, recipient, amount,
+        send_description=f'Transfer to {recipient.user.username} (Boiya ID: {recipient_boiya_id})',
+        receive_description=f'Transfer from {sender.user.username}'
+    )
+
+
+class Command(BaseCommand):
+    help = "Benchmark P2P transfers per second: the legacy SendView path against the ledger engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='Transfers to run per mode.')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        amount = Decimal('1.00')
+        tag = get_random_string(8).lower()
+        users = [
+            User.objects.create_user(email=f'bench-{tag}-{i}@boiya.local', username=f'bench_{tag}_{i}', password=None)
+            for i in range(2)
+        ]
+        try:
+            wallets = list(Wallet.objects.select_related('user').filter(user__in=users).order_by('id'))
+            Wallet.objects.filter(pk__in=[w.pk for w in wallets]).update(balance=Decimal(count) * 2)
+            for wallet in wallets:
+                wallet.refresh_from_db(fields=['balance'])
+
+            self.stdout.write(f"Database: {connection.vendor}, {count} transfers per mode")
+            for name, run in (('legacy', legacy_transfer), ('ledger', ledger_transfer)):
+                with CaptureQueriesContext(connection) as queries:
+                    run(wallets[0], wallets[1].boiya_id, amount)
+
+                started = time.perf_counter()
+                for i in range(count):
+                    sender, recipient = wallets[i % 2], wallets[(i + 1) % 2]
+                    run(sender, recipient.boiya_id, amount)
+                elapsed = time.perf_counter() - started
+
+                self.stdout.write(
+                    f"{name:>7}: {count / elapsed:8.1f} transfers/s, "
+                    f"{len(queries.captured_queries)} queries per transfer"
+                )
+        finally:
+            User.objects.filter(pk__in=[u.pk for u in users]).delete()
@@ -0,0 +1,26 @@
+# apps/raw/management/commands/process_media_uploads.py
+import time
+from django.core.management.base import BaseCommand
+from apps.raw.media import process_pending_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Upload staged media files that are still pending (e.g. after a restart or a failed attempt) "
+        "and save their URLs. Run it every minute, or with --loop as the only upload worker when "
+        "MEDIA_UPLOAD_IN_PROCESS is off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Process at most this many uploads per pass.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting after one pass.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between passes with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            done, failed = process_pending_uploads(limit=options['limit'])
+            if done or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"Uploaded {done} files, {failed} failed."))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
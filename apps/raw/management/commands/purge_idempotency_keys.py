@@ -0,0 +1,23 @@
+# apps/raw/management/commands/purge_idempotency_keys.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.raw.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses older than settings.IDEMPOTENCY_KEY_TTL."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per statement.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        expired = IdempotencyKey.objects.filter(created_at__lt=cutoff)
+        deleted = 0
+        while True:
+            batch = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            deleted += IdempotencyKey.objects.filter(id__in=batch).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired idempotency keys."))
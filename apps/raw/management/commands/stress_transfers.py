@@ -0,0 +1,126 @@
+# apps/raw/management/commands/stress_transfers.py
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.utils.crypto import get_random_string
+from apps.users.models import User
+from apps.raw.models import Wallet, Transaction
+from apps.raw import ledger
+
+REWARD = Decimal('1.00')  # credited to every pool wallet by each --reward-runs run
+
+def _total(queryset, field):
+    # SQLite sums decimals as floats; compare at the ledger's precision
+    total = queryset.aggregate(total=Sum(field))['total'] or Decimal('0.00')
+    return Decimal(str(total)).quantize(ledger.CENT)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire random concurrent cross-transfers between a pool of throwaway wallets, then check that "
+        "the total coin supply is unchanged. With --reward-runs, set-based rule credits over the whole "
+        "pool run among the transfers. Reports throughput and latency percentiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallets', type=int, default=10, help='Size of the wallet pool (small pools mean more contention).')
+        parser.add_argument('--transfers', type=int, default=2000, help='Total transfers to attempt.')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent worker threads.')
+        parser.add_argument('--balance', type=Decimal, default=Decimal('100.00'), help='Opening balance of each wallet.')
+        parser.add_argument('--reward-runs', type=int, default=0, help='Reward-rule credits (credit_matching) over the pool, spread among the transfers.')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated users and wallets afterwards.')
+
+    def handle(self, *args, **options):
+        tag = get_random_string(8).lower()
+        users = [
+            User.objects.create_user(email=f'stress-{tag}-{i}@boiya.local', username=f'stress_{tag}_{i}', password=None)
+            for i in range(options['wallets'])
+        ]
+        wallet_ids = list(Wallet.objects.filter(user__in=users).values_list('id', flat=True))
+        Wallet.objects.filter(id__in=wallet_ids).update(balance=options['balance'])
+        supply_before = _total(Wallet.objects.filter(id__in=wallet_ids), 'balance')
+
+        local = threading.local()
+        latencies = []
+        outcomes = {'completed': 0, 'insufficient': 0, 'rewards': 0, 'errors': 0}
+        granted = []
+        lock = threading.Lock()
+        jobs = ['transfer'] * options['transfers']
+        for run in range(options['reward_runs']):
+            jobs.insert(run * len(jobs) // options['reward_runs'], 'reward')
+
+        def run_reward():
+            try:
+                credited = ledger.credit_matching(Wallet.objects.filter(id__in=wallet_ids), REWARD, 'ADMIN_GRANT', description='Stress reward')
+                outcome = 'rewards'
+            except Exception as exc:
+                credited, outcome = 0, 'errors'
+                self.stderr.write(f"{type(exc).__name__}: {exc}")
+            with lock:
+                granted.append(REWARD * credited)
+                outcomes[outcome] += 1
+
+        def run_one(job):
+            if job == 'reward':
+                return run_reward()
+            if not hasattr(local, 'wallets'):
+                local.wallets = {w.pk: w for w in Wallet.objects.filter(id__in=wallet_ids)}
+            sender_id, recipient_id = random.sample(wallet_ids, 2)
+            amount = Decimal(random.randint(1, 2000)) / 100
+            started = time.perf_counter()
+            try:
+                ledger.transfer(local.wallets[sender_id], local.wallets[recipient_id], amount)
+                outcome = 'completed'
+            except ledger.InsufficientBalance:
+                outcome = 'insufficient'
+            except Exception as exc:
+                outcome = 'errors'
+                self.stderr.write(f"{type(exc).__name__}: {exc}")
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                outcomes[outcome] += 1
+
+        def worker_done(_):
+            connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            list(pool.map(run_one, jobs))
+            # Give every worker thread a chance to release its own database connection
+            list(pool.map(worker_done, range(options['threads'])))
+        wall_time = time.perf_counter() - started
+
+        try:
+            supply_after = _total(Wallet.objects.filter(id__in=wallet_ids), 'balance')
+            postings = Transaction.objects.filter(wallet_id__in=wallet_ids, status='COMPLETED')
+            sent = _total(postings.filter(transaction_type='TRANSFER_SEND'), 'amount')
+            received = _total(postings.filter(transaction_type='TRANSFER_RECEIVE'), 'amount')
+            rewarded = _total(postings.filter(transaction_type='ADMIN_GRANT'), 'amount')
+            supply_expected = supply_before + sum(granted, Decimal('0.00'))
+            negative = Wallet.objects.filter(id__in=wallet_ids, balance__lt=0).count()
+
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            self.stdout.write(
+                f"Database: {connection.vendor}, {options['threads']} threads, {options['wallets']} wallets\n"
+                f"Outcomes: {outcomes}\n"
+                f"Throughput: {options['transfers'] / wall_time:.1f} transfers/s over {wall_time:.2f}s\n"
+                f"Latency: p50 {p50:.1f} ms, p99 {p99:.1f} ms\n"
+                f"Supply: {supply_before} before, {supply_after} after; sent {sent}, received {received}, rewarded {rewarded}"
+            )
+
+            if supply_after != supply_expected or rewarded != supply_expected - supply_before or sent != received or negative:
+                raise CommandError("Ledger invariant violated: coin supply was not conserved.")
+            if outcomes['errors']:
+                raise CommandError(f"{outcomes['errors']} postings failed with database errors.")
+            self.stdout.write(self.style.SUCCESS("Coin supply conserved."))
+        finally:
+            if not options['keep']:
+                User.objects.filter(pk__in=[u.pk for u in users]).delete()
@@ -0,0 +1,253 @@
+# apps/raw/media.py
+"""
+Pluggable storage for uploaded media (product thumbnails and files, profile pictures).
+- settings.MEDIA_STORAGE names the backend class: CloudinaryMediaStorage in production,
+  LocalMediaStorage (MEDIA_ROOT, served under MEDIA_URL) for development and tests.
+- A backend takes a file-like object or bytes and returns the public URL of the stored copy.
+
+Request-time uploads go through the background pipeline instead of calling the backend:
+- stage_upload copies the file to MEDIA_STAGING_ROOT and records a PENDING MediaUpload.
+- After commit, the upload is handed to an in-process pool of MEDIA_BACKGROUND_WORKERS threads
+  (unless MEDIA_UPLOAD_IN_PROCESS is off), which retries failed attempts with a backoff.
+- The process_media_uploads command must be scheduled (every minute) in any case: uploads queued
+  in a worker that restarted, or claimed by one that died, are only recovered by it. It can also
+  replace the pool entirely.
+- When the upload is done, the target row's URL field is saved, so post_save handlers run.
+- Pictures staged with stage_image are validated in the request, and the worker uploads resized,
+  metadata-free derivatives (apps/raw/images.py) instead of the original.
+"""
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+import cloudinary.uploader
+from .models import MediaUpload
+from .images import IMAGE_SIZES, make_derivatives, validate_image
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_ATTEMPTS = 3
+RETRY_BACKOFF = 5  # seconds before the in-process retry of a failed attempt, doubled per attempt
+STALE_UPLOAD_AFTER = timedelta(minutes=10)  # an UPLOADING row this old lost its worker
+
+
+class CloudinaryMediaStorage:
+    """
+    Uploads to Cloudinary; resource_type 'raw' is used for non-image files (PDFs).
+    """
+    def save(self, content, folder, name=None, resource_type='image'):
+        result = cloudinary.uploader.upload(content, folder=folder, resource_type=resource_type)
+        return result['secure_url']
+
+
+class LocalMediaStorage:
+    """
+    Stand-in backend writing to MEDIA_ROOT/<folder>/, served from MEDIA_URL when DEBUG is on.
+    """
+    def __init__(self):
+        self.storage = FileSystemStorage(location=settings.MEDIA_ROOT, base_url=settings.MEDIA_URL)
+
+    def save(self, content, folder, name=None, resource_type='image'):
+        if isinstance(content, bytes):
+            content = ContentFile(content)
+        elif not isinstance(content, File):
+            content = File(content)
+        name = os.path.basename(name or getattr(content, 'name', None) or '') or uuid.uuid4().hex
+        stored = self.storage.save(f'{folder}/{uuid.uuid4().hex[:8]}-{name}', content)
+        return self.storage.url(stored)
+
+
+@lru_cache(maxsize=None)
+def get_media_storage():
+    return import_string(settings.MEDIA_STORAGE)()
+
+
+def upload_media(content, folder, name=None, resource_type='image'):
+    """
+    Store content with the configured backend and return its URL.
+    """
+    return get_media_storage().save(content, folder, name=name, resource_type=resource_type)
+
+
+# ---------------------------
+# Background upload pipeline
+# ---------------------------
+@lru_cache(maxsize=None)
+def _staging():
+    return FileSystemStorage(location=settings.MEDIA_STAGING_ROOT)
+
+
+@lru_cache(maxsize=None)
+def _executor():
+    return ThreadPoolExecutor(max_workers=settings.MEDIA_BACKGROUND_WORKERS, thread_name_prefix='media-upload')
+
+
+def stage_upload(content, instance, field, folder, resource_type='image', user=None, name=None, **image_options):
+    """
+    Stage content for a background upload whose URL will be saved to instance.<field>.
+    - The file is copied to local disk now; the upload starts once the current transaction commits.
+    - image_options (sizes, primary_size, variants_field) turn on derivatives; see stage_image.
+    Returns the PENDING MediaUpload.
+    """
+    if isinstance(content, bytes):
+        content = ContentFile(content)
+    name = os.path.basename(name or getattr(content, 'name', None) or '') or 'upload'
+    staged_path = _staging().save(f'{uuid.uuid4().hex}-{name}', content)
+    upload = MediaUpload.objects.create(
+        uploaded_by=user,
+        target_model=instance._meta.label,
+        target_id=instance.pk,
+        target_field=field,
+        folder=folder,
+        resource_type=resource_type,
+        original_name=name,
+        staged_path=staged_path,
+        **image_options
+    )
+    transaction.on_commit(lambda: dispatch_upload(upload.pk))
+    return upload
+
+
+def stage_image(content, instance, field, folder, variants_field, primary_size, user=None):
+    """
+    Validate a picture and stage it for upload as IMAGE_SIZES derivatives.
+    - instance.<field> gets the primary_size derivative and instance.<variants_field> every size.
+    Raises InvalidImage before anything is written.
+    """
+    validate_image(content)
+    return stage_upload(
+        content, instance, field, folder, user=user,
+        sizes=list(IMAGE_SIZES), primary_size=primary_size, variants_field=variants_field,
+    )
+
+
+def _upload_derivatives(upload, staged):
+    stem = os.path.splitext(upload.original_name)[0] or 'image'
+    variants = {}
+    for sizes, data, extension in make_derivatives(staged, upload.sizes):
+        url = upload_media(data, upload.folder, name=f'{stem}-{sizes[0]}.{extension}')
+        variants.update((str(size), url) for size in sizes)
+    return variants
+
+
+def dispatch_upload(upload_id):
+    if settings.MEDIA_UPLOAD_IN_PROCESS:
+        _executor().submit(_run_in_thread, upload_id)
+
+
+def _run_in_thread(upload_id):
+    try:
+        if not process_upload(upload_id):
+            _retry_later(upload_id)
+    except Exception:
+        logger.exception("Background upload %s crashed", upload_id)
+    finally:
+        connection.close()  # worker threads get their own connection; don't leak it
+
+
+def _retry_later(upload_id):
+    # Only a failed attempt leaves the row PENDING; a lost claim or a final failure does not
+    attempts = MediaUpload.objects.filter(pk=upload_id, status='PENDING').values_list('attempts', flat=True).first()
+    if attempts:
+        timer = threading.Timer(RETRY_BACKOFF * 2 ** (attempts - 1), dispatch_upload, args=[upload_id])
+        timer.daemon = True
+        timer.start()
+
+
+def _claim(upload_id):
+    return MediaUpload.objects.filter(pk=upload_id, status='PENDING').update(
+        status='UPLOADING',
+        attempts=F('attempts') + 1,
+        updated_at=timezone.now(),
+    ) == 1
+
+
+def _fail(upload, exc):
+    upload.status = 'PENDING' if upload.attempts < MAX_UPLOAD_ATTEMPTS else 'FAILED'
+    upload.error = str(exc)[:1000]
+    upload.save(update_fields=['status', 'error', 'updated_at'])
+    if upload.status == 'FAILED':
+        _staging().delete(upload.staged_path)
+    logger.warning("Upload %s failed (attempt %s): %s", upload.pk, upload.attempts, exc)
+
+
+def process_upload(upload_id):
+    """
+    Upload one staged file and save its URL on the target row.
+    - The PENDING -> UPLOADING claim is a single conditional UPDATE, so the in-process pool and the
+      command never upload the same file twice.
+    - The URL is recorded as soon as the storage returns it, so a retry after a failed save does
+      not upload the file again.
+    - An older upload finishing after a newer one for the same field does not overwrite it: the
+      target row is locked before the check, so two uploads for it finish one at a time.
+    Returns True if the upload is DONE.
+    """
+    if not _claim(upload_id):
+        return False
+    upload = MediaUpload.objects.get(pk=upload_id)
+    try:
+        if not upload.url:
+            with _staging().open(upload.staged_path, 'rb') as staged:
+                if upload.sizes:
+                    upload.variants = _upload_derivatives(upload, staged)
+                    upload.url = upload.variants[str(upload.primary_size)]
+                else:
+                    upload.url = upload_media(
+                        staged, upload.folder, name=upload.original_name, resource_type=upload.resource_type
+                    )
+            upload.save(update_fields=['url', 'variants', 'updated_at'])
+
+        with transaction.atomic():
+            target = apps.get_model(upload.target_model).objects.select_for_update().filter(pk=upload.target_id).first()
+            superseded = MediaUpload.objects.filter(
+                target_model=upload.target_model,
+                target_id=upload.target_id,
+                target_field=upload.target_field,
+                status='DONE',
+                pk__gt=upload.pk,
+            ).exists()
+            if target is not None and not superseded:
+                fields = [upload.target_field]
+                setattr(target, upload.target_field, upload.url)
+                if upload.variants_field:
+                    setattr(target, upload.variants_field, upload.variants)
+                    fields.append(upload.variants_field)
+                target.save(update_fields=fields)
+            upload.status = 'DONE'
+            upload.error = ''
+            upload.save(update_fields=['status', 'error', 'updated_at'])
+    except Exception as exc:  # storage backends and the target's save raise their own error types
+        _fail(upload, exc)
+        return False
+    _staging().delete(upload.staged_path)
+    return True
+
+
+def process_pending_uploads(limit=None):
+    """
+    Upload every PENDING file, oldest first, after releasing uploads stuck in UPLOADING.
+    Returns (done, failed) counts.
+    """
+    MediaUpload.objects.filter(
+        status='UPLOADING',
+        updated_at__lt=timezone.now() - STALE_UPLOAD_AFTER,
+    ).update(status='PENDING', updated_at=timezone.now())
+    pending = MediaUpload.objects.filter(status='PENDING').order_by('created_at').values_list('pk', flat=True)
+    done = failed = 0
+    for upload_id in list(pending[:limit] if limit else pending):
+        if process_upload(upload_id):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
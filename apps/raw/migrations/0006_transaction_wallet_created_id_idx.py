@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('raw', '0005_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['wallet', '-created_at', '-id'], name='txn_wallet_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('raw', '0006_transaction_wallet_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-created_at', '-id'], name='txn_created_id_idx'),
+        ),
+    ]
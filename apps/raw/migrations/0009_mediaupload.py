@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('raw', '0008_wallet_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_model', models.CharField(max_length=100)),
+                ('target_id', models.PositiveBigIntegerField()),
+                ('target_field', models.CharField(max_length=50)),
+                ('folder', models.CharField(max_length=100)),
+                ('resource_type', models.CharField(default='image', max_length=10)),
+                ('original_name', models.CharField(blank=True, max_length=255)),
+                ('staged_path', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('UPLOADING', 'Uploading'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('url', models.URLField(blank=True, max_length=500, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='media_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='media_upload_status_idx'), models.Index(fields=['target_model', 'target_id', 'target_field'], name='media_upload_target_idx')],
+            },
+        ),
+    ]
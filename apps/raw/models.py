@@ -12,20 +12,37 @@ class Wallet(models.Model):
     balance = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
     boiya_id = models.CharField(max_length=20, unique=True, editable=False)
     last_login_bonus = models.DateField(null=True, blank=True)
+    # Bumped by every ledger posting (see apps/raw/ledger.py); exposed as the wallet ETag
+    version = models.PositiveBigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.user.username}'s Wallet: {self.balance} Booya Coins"
 
+    def save(self, *args, **kwargs):
+        # A direct write can change what the versioned endpoints show, so it moves the version
+        # forward too; F() keeps it monotonic even if this instance holds a stale value
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        self.version = models.F('version') + 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
+        # Leave the new value deferred: it is only read back (one query) if something uses it
+        del self.__dict__['version']
+
     def add_coins(self, amount):
+        # Balance-only credit through the ledger; use ledger.credit to also record a Transaction
+        from .ledger import credit_balance
         if amount > 0:
-            self.balance += Decimal(amount)
-            self.save()
+            self.balance = credit_balance(self.pk, amount)
 
     def remove_coins(self, amount):
-        if amount > 0 and self.balance >= Decimal(amount):
-            self.balance -= Decimal(amount)
-            self.save()
-            return True
+        from .ledger import debit_balance
+        if amount > 0:
+            new_balance = debit_balance(self.pk, amount)
+            if new_balance is not None:
+                self.balance = new_balance
+                return True
         return False
 
 class Transaction(models.Model):
@@ -53,6 +70,14 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     product_id = models.PositiveIntegerField(null=True, blank=True)  # New field to link to Product
 
+    class Meta:
+        indexes = [
+            # Serves per-wallet history pages in keyset order (see apps/raw/pagination.py)
+            models.Index(fields=['wallet', '-created_at', '-id'], name='txn_wallet_created_id_idx'),
+            # Serves the ledger-wide admin history in keyset order
+            models.Index(fields=['-created_at', '-id'], name='txn_created_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type} of {self.amount} for {self.wallet.user.username} - {self.status}"
 
@@ -73,17 +98,78 @@ class UserTaskCompletion(models.Model):
     class Meta:
         unique_together = ('user', 'task')
 
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of a money-moving request, keyed by the client's Idempotency-Key header.
+    - fingerprint: hash of method, path and body, so a key cannot be reused for a different request.
+    - The row is written in the same transaction as the request's effects (apps/raw/idempotency.py),
+      so other requests only ever see it with its response.
+    - Rows older than settings.IDEMPOTENCY_KEY_TTL are ignored and purged.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.key} for {self.user.username}"
+
+class MediaUpload(models.Model):
+    """
+    A media file staged on local disk, waiting to be pushed to the media storage by a background worker.
+    - target_model / target_id / target_field: the row and URL field set once the upload is done
+      (e.g. 'users.User', 7, 'profile_image').
+    - status: PENDING until a worker claims it, UPLOADING while it runs, then DONE or FAILED;
+      failed attempts go back to PENDING until MAX_UPLOAD_ATTEMPTS (see apps/raw/media.py).
+    - sizes: for pictures, the derivative sizes to render (apps/raw/images.py) instead of uploading the
+      original; url is then the primary_size derivative, and variants ({size: url}) is also saved to
+      the target's variants_field.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('UPLOADING', 'Uploading'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='media_uploads')
+    target_model = models.CharField(max_length=100)
+    target_id = models.PositiveBigIntegerField()
+    target_field = models.CharField(max_length=50)
+    folder = models.CharField(max_length=100)
+    resource_type = models.CharField(max_length=10, default='image')
+    original_name = models.CharField(max_length=255, blank=True)
+    staged_path = models.CharField(max_length=255)
+    sizes = models.JSONField(default=list, blank=True)
+    primary_size = models.PositiveSmallIntegerField(null=True, blank=True)
+    variants_field = models.CharField(max_length=50, blank=True)
+    variants = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    url = models.URLField(max_length=500, null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='media_upload_status_idx'),
+            models.Index(fields=['target_model', 'target_id', 'target_field'], name='media_upload_target_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.target_model}#{self.target_id}.{self.target_field}: {self.status}"
+
 # Signal for signup bonus
 @receiver(post_save, sender=User)
 def create_wallet(sender, instance, created, **kwargs):
     if created:
         boiya_id = get_random_string(length=12, allowed_chars='ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+        from .ledger import credit
         wallet = Wallet.objects.create(user=instance, boiya_id=boiya_id)
-        wallet.add_coins(Decimal('50.00'))
-        Transaction.objects.create(
-            wallet=wallet,
-            amount=Decimal('50.00'),
-            transaction_type='SIGNUP_BONUS',
-            status='COMPLETED',
-            description='Signup bonus'
-        )
\ No newline at end of file
+        credit(wallet, Decimal('50.00'), 'SIGNUP_BONUS', status='COMPLETED', description='Signup bonus')
\ No newline at end of file
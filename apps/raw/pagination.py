@@ -0,0 +1,154 @@
+# apps/raw/pagination.py
+import base64
+import json
+from datetime import datetime
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimated_count(queryset):
+    """
+    Row count for a queryset without scanning it, as (count, is_estimate).
+    - PostgreSQL: the planner's row estimate (EXPLAIN), which costs the same whatever the table size.
+    - Other backends: an exact COUNT(*), which is fine for the small databases they hold.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count(), False
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows']), True
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a (timestamp, id) key, newest first.
+    - Each page starts an index range scan at the cursor, so deep pages cost the same as the first.
+    - The cursor is an opaque token holding the last row's (timestamp, id); no COUNT or OFFSET is run.
+    - Responses look like {"next": <url or null>, "results": [...]}.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    timestamp_field = 'created_at'
+    id_field = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(requested, self.max_page_size))
+
+    def encode_cursor(self, row):
+        position = f"{getattr(row, self.timestamp_field).isoformat()}|{getattr(row, self.id_field)}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            timestamp, pk = base64.urlsafe_b64decode(token.encode()).decode().split('|')
+            return datetime.fromisoformat(timestamp), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def filter_after_cursor(self, queryset, cursor):
+        timestamp, pk = cursor
+        # The redundant <= bound lets the (…, created_at, id) index serve the range scan
+        return queryset.filter(**{f'{self.timestamp_field}__lte': timestamp}).filter(
+            Q(**{f'{self.timestamp_field}__lt': timestamp}) | Q(**{f'{self.id_field}__lt': pk})
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(f'-{self.timestamp_field}', f'-{self.id_field}')
+        cursor = self.decode_cursor(request)
+        if cursor:
+            queryset = self.filter_after_cursor(queryset, cursor)
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class EstimatedCountKeysetPagination(KeysetPagination):
+    """
+    KeysetPagination that also reports an approximate total for page counters in the UI.
+    - Responses look like {"count": <estimate>, "count_is_estimate": true, "next": ..., "results": [...]};
+      count_is_estimate is false when the backend counted exactly.
+    """
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count, self.count_is_estimate = estimated_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'count_is_estimate': self.count_is_estimate,
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'].update({
+            'count': {'type': 'integer'},
+            'count_is_estimate': {'type': 'boolean'},
+        })
+        return response_schema
+
+
+class CursorOnRequestPagination(BasePagination):
+    """
+    Page-number pagination by default; keyset pagination once the client asks for it with the
+    cursor parameter (empty for the first page, then taken from 'next').
+    - page_number_class and keyset_class are the paginators used for each mode.
+    """
+    page_number_class = PageNumberPagination
+    keyset_class = EstimatedCountKeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        keyset = self.keyset_class.cursor_query_param in request.query_params
+        self.paginator = (self.keyset_class if keyset else self.page_number_class)()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number_class().get_paginated_response_schema(schema)
@@ -1,6 +1,6 @@
 # apps/raw/serializers.py
 from rest_framework import serializers
-from .models import Wallet, Transaction, Task
+from .models import Wallet, Transaction, Task, MediaUpload
 
 class WalletSerializer(serializers.ModelSerializer):
     class Meta:
@@ -33,4 +33,15 @@ class TaskSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'reward_coins', 'is_active']
 
 class TaskCompletionSerializer(serializers.Serializer):
-    task_id = serializers.IntegerField()
\ No newline at end of file
+    task_id = serializers.IntegerField()
+
+class MediaUploadSerializer(serializers.ModelSerializer):
+    """
+    State of a background upload: 'url' is set, and copied to the target field, once status is DONE.
+    """
+    field = serializers.CharField(source='target_field', read_only=True)
+
+    class Meta:
+        model = MediaUpload
+        fields = ['id', 'field', 'status', 'url', 'error', 'created_at', 'updated_at']
+        read_only_fields = fields
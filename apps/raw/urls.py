@@ -1,10 +1,11 @@
 # apps/raw/urls.py
 from django.urls import path
-from .views import WalletBalanceView, TransferView, CompleteTaskView, TaskListView
+from .views import WalletBalanceView, TransferView, CompleteTaskView, TaskListView, MediaUploadDetailView
 
 urlpatterns = [
     path('balance/', WalletBalanceView.as_view(), name='wallet_balance'),
     path('transfer/', TransferView.as_view(), name='transfer'),
     path('complete-task/', CompleteTaskView.as_view(), name='complete_task'),
     path('tasks/', TaskListView.as_view(), name='task_list'),
+    path('uploads/<int:pk>/', MediaUploadDetailView.as_view(), name='media_upload_detail'),
 ]
\ No newline at end of file
@@ -1,8 +1,11 @@
 # apps/raw/views.py
 from rest_framework import generics, permissions
 from rest_framework.response import Response
-from .models import Wallet, Transaction, Task, UserTaskCompletion
-from .serializers import WalletSerializer, TransferSerializer, TaskCompletionSerializer, TaskSerializer
+from django.db import transaction
+from . import ledger
+from .idempotency import idempotent
+from .models import Wallet, Task, UserTaskCompletion, MediaUpload
+from .serializers import WalletSerializer, TransferSerializer, TaskCompletionSerializer, TaskSerializer, MediaUploadSerializer
 
 class WalletBalanceView(generics.RetrieveAPIView):
     serializer_class = WalletSerializer
@@ -15,6 +18,7 @@ class TransferView(generics.GenericAPIView):
     serializer_class = TransferSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
@@ -22,21 +26,10 @@ class TransferView(generics.GenericAPIView):
         recipient_wallet = Wallet.objects.get(boiya_id=serializer.validated_data['recipient_boiya_id'])
         amount = serializer.validated_data['amount']
 
-        sender_wallet.subtract_coins(amount)
-        recipient_wallet.add_coins(amount)
-
-        Transaction.objects.create(
-            wallet=sender_wallet,
-            amount=amount,
-            transaction_type='TRANSFER_SEND',
-            recipient_wallet=recipient_wallet
-        )
-        Transaction.objects.create(
-            wallet=recipient_wallet,
-            amount=amount,
-            transaction_type='TRANSFER_RECEIVE',
-            recipient_wallet=sender_wallet
-        )
+        try:
+            ledger.transfer(sender_wallet, recipient_wallet, amount)
+        except ledger.InsufficientBalance:
+            return Response({"detail": "Insufficient balance"}, status=400)
 
         return Response({"detail": "Transfer successful", "new_balance": sender_wallet.balance})
 
@@ -44,6 +37,7 @@ class CompleteTaskView(generics.GenericAPIView):
     serializer_class = TaskCompletionSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -56,19 +50,27 @@ class CompleteTaskView(generics.GenericAPIView):
         if UserTaskCompletion.objects.filter(user=request.user, task=task).exists():
             return Response({"detail": "Task already completed"}, status=400)
 
-        UserTaskCompletion.objects.create(user=request.user, task=task)
         wallet = request.user.wallet
-        wallet.add_coins(task.reward_coins)
-        Transaction.objects.create(
-            wallet=wallet,
-            amount=task.reward_coins,
-            transaction_type='TASK_REWARD',
-            description=f"Completed task: {task.title}"
-        )
+        with transaction.atomic():
+            UserTaskCompletion.objects.create(user=request.user, task=task)
+            ledger.credit(wallet, task.reward_coins, 'TASK_REWARD', description=f"Completed task: {task.title}")
 
         return Response({"detail": "Task completed", "reward": task.reward_coins, "new_balance": wallet.balance})
 
 class TaskListView(generics.ListAPIView):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
-    queryset = Task.objects.filter(is_active=True)
\ No newline at end of file
+    queryset = Task.objects.filter(is_active=True)
+
+class MediaUploadDetailView(generics.RetrieveAPIView):
+    """
+    Poll a background upload started by a profile or product update.
+    - Users see their own uploads; admins see all of them.
+    """
+    serializer_class = MediaUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.is_superuser:
+            return MediaUpload.objects.all()
+        return MediaUpload.objects.filter(uploaded_by=self.request.user)
@@ -0,0 +1,62 @@
+# apps/shop/catalog.py
+"""
+Catalog snapshots for the shop's read endpoints.
+- The catalog version is the 'catalog' generation from apps/admin_api/caching.py, bumped after
+  any Product / Category save or delete (including pause and play).
+- Each (version, listing) pair is rendered to JSON once and stored in the cache as bytes.
+- The ETag is derived from the version and listing alone, so a matching If-None-Match is
+  answered with 304 before any snapshot is loaded or any query runs.
+"""
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+from apps.admin_api.caching import CATALOG, generation
+from apps.admin_api.models import Product, Category
+from .serializers import ProductListSerializer, CategorySerializer
+
+SNAPSHOT_TIMEOUT = 24 * 60 * 60  # older versions are unreachable anyway; this only bounds memory
+
+
+def _render_products(category_id):
+    queryset = Product.objects.filter(paused=False, category__paused=False).select_related('category').order_by('id')
+    if category_id is not None:
+        queryset = queryset.filter(category_id=category_id)
+    return JSONRenderer().render(ProductListSerializer(queryset, many=True).data)
+
+
+def _render_categories():
+    queryset = Category.objects.filter(paused=False).order_by('id')
+    return JSONRenderer().render(CategorySerializer(queryset, many=True).data)
+
+
+def _snapshot_response(request, listing, render):
+    version = generation(CATALOG)
+    etag = f'"catalog-{version}-{listing}"'
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in client_etags or '*' in client_etags:
+        return HttpResponseNotModified(headers=headers)
+
+    key = f'shop:catalog:{version}:{listing}'
+    body = cache.get(key)
+    if body is None:
+        body = render()
+        cache.set(key, body, SNAPSHOT_TIMEOUT)
+    return HttpResponse(body, content_type='application/json', headers=headers)
+
+
+def products_response(request, category_id=None):
+    """
+    Active products from active categories, optionally for one category.
+    """
+    listing = 'products' if category_id is None else f'products-{category_id}'
+    return _snapshot_response(request, listing, lambda: _render_products(category_id))
+
+
+def categories_response(request):
+    """
+    Active categories.
+    """
+    return _snapshot_response(request, 'categories', _render_categories)
@@ -25,7 +25,7 @@ class ProductListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'price', 'thumbnail_url', 'description', 'category_name']
+        fields = ['id', 'name', 'price', 'thumbnail_url', 'thumbnail_variants', 'description', 'category_name']
 
 class PurchaseDetailSerializer(serializers.ModelSerializer):
     """
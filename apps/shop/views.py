@@ -3,38 +3,63 @@ from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from .serializers import ProductListSerializer, PurchaseSerializer, PurchaseDetailSerializer, CategorySerializer
 from apps.admin_api.models import Product, Category
-from apps.raw.models import Wallet, Transaction
+from apps.raw.models import Wallet
+from apps.raw import ledger
+from apps.raw.idempotency import idempotent
+from django.db import transaction as db_transaction
 from apps.shop.models import UserPurchase
 from decimal import Decimal
 from rest_framework.exceptions import PermissionDenied
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from .catalog import products_response, categories_response
+from apps.admin_api.search import search_products, search_terms
 
 class CategoryListView(generics.ListAPIView):
     """
     List all available categories for the shop.
     - Shows only non-paused categories.
+    - Served from the catalog snapshot cache with a strong ETag (see apps/shop/catalog.py).
     """
     permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [JWTStatelessUserAuthentication]
     serializer_class = CategorySerializer
 
     def get_queryset(self):
         return Category.objects.filter(paused=False)
 
+    def list(self, request, *args, **kwargs):
+        return categories_response(request)
+
 class ProductListView(generics.ListAPIView):
     """
     List all available products for the shop with category filtering.
     - Shows only non-paused products from non-paused categories.
     - Filters by category if 'category' query parameter is provided (e.g., ?category=1).
     - 'All' is implied when no category is specified.
+    - Searches name and description if 'q' is provided (e.g., ?q=maths), best matches first.
+    - Served from the catalog snapshot cache with a strong ETag (see apps/shop/catalog.py);
+      searches are answered live.
     """
     permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [JWTStatelessUserAuthentication]
     serializer_class = ProductListSerializer
 
     def get_queryset(self):
-        queryset = Product.objects.filter(paused=False, category__paused=False)
+        queryset = Product.objects.filter(paused=False, category__paused=False).select_related('category')
         category_id = self.request.query_params.get('category', None)
         if category_id and category_id != 'all':
             queryset = queryset.filter(category_id=category_id)
-        return queryset
+        return search_products(queryset, self.request.query_params.get('q'))
+
+    def list(self, request, *args, **kwargs):
+        category_id = request.query_params.get('category', None)
+        if category_id and category_id != 'all' and not category_id.isdigit():
+            return Response({"detail": "category must be a category id or 'all'."}, status=status.HTTP_400_BAD_REQUEST)
+        if search_terms(request.query_params.get('q')):
+            return super().list(request, *args, **kwargs)
+        if not category_id or category_id == 'all':
+            return products_response(request)
+        return products_response(request, int(category_id))
 
 class PurchaseView(generics.GenericAPIView):
     """
@@ -45,6 +70,7 @@ class PurchaseView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = PurchaseSerializer
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
@@ -52,25 +78,26 @@ class PurchaseView(generics.GenericAPIView):
         product = serializer.validated_data['product']
         wallet = serializer.validated_data['wallet']
 
-        if wallet.remove_coins(product.price):
-            transaction = Transaction.objects.create(
-                wallet=wallet,
-                amount=product.price,
-                transaction_type='SHOP_REDEMPTION',
-                product_id=product.id,
-                status='COMPLETED',
-                description=f'Purchase of {product.name}'
-            )
-            purchase = UserPurchase.objects.create(
-                user=user,
-                product=product,
-                transaction_id=transaction
-            )
-            product.sales += 1
-            product.save(update_fields=['sales'])
-            purchase_serializer = PurchaseDetailSerializer(product)
-            return Response({
-                "message": f"Purchase successful! You bought the {product.name}.",
-                "download": purchase_serializer.data.get('file_url')
-            }, status=status.HTTP_200_OK)
-        return Response({"error": "Purchase failed due to insufficient balance."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with db_transaction.atomic():
+                transaction = ledger.debit(
+                    wallet,
+                    product.price,
+                    'SHOP_REDEMPTION',
+                    product_id=product.id,
+                    status='COMPLETED',
+                    description=f'Purchase of {product.name}'
+                )
+                purchase = UserPurchase.objects.create(
+                    user=user,
+                    product=product,
+                    transaction_id=transaction
+                )
+        except ledger.InsufficientBalance:
+            return Response({"error": "Purchase failed due to insufficient balance."}, status=status.HTTP_400_BAD_REQUEST)
+
+        purchase_serializer = PurchaseDetailSerializer(product)
+        return Response({
+            "message": f"Purchase successful! You bought the {product.name}.",
+            "download": purchase_serializer.data.get('file_url')
+        }, status=status.HTTP_200_OK)
@@ -48,6 +48,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     date_of_birth = models.DateField(null=True, blank=True)
     grade = models.CharField(max_length=10, choices=GRADE_CHOICES, null=True, blank=True)
     profile_image = models.URLField(max_length=500, null=True, blank=True, default=None)  # New field for Cloudinary URL
+    profile_image_variants = models.JSONField(default=dict, blank=True)  # {"64": url, "256": url, "1024": url}
 
     # Login info
     email = models.EmailField(unique=True)
@@ -40,7 +40,7 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ['username', 'id', 'coin', 'member_since', 'profile_image', 'is_2fa_enabled']
+        fields = ['username', 'id', 'coin', 'member_since', 'profile_image', 'profile_image_variants', 'is_2fa_enabled']
 
     def get_coin(self, obj):
         # Return the user's coin balance from the wallet
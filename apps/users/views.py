@@ -9,8 +9,18 @@ import logging
 from django.core.mail import send_mail
 from django.conf import settings
 from apps.raw.models import Wallet, Transaction
+from apps.raw import ledger
+from apps.raw.idempotency import idempotent
+from apps.raw.pagination import KeysetPagination
+from apps.raw.media import stage_image
+from apps.raw.images import InvalidImage
+from apps.raw.serializers import MediaUploadSerializer
 from django.utils import timezone
 from decimal import Decimal
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+import hashlib
+import time
 import cloudinary
 import cloudinary.uploader
 from environ import Env  # Updated to use environ from settings.py
@@ -25,6 +35,23 @@ cloudinary.config(
 
 logger = logging.getLogger(__name__)
 
+
+# Conditional GET for the polled wallet endpoints: the tags are built from Wallet.version,
+# so an unchanged wallet is answered with 304 after one indexed lookup and no serialization
+def _etag_matches(request, etag):
+    client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return etag in client_etags or '*' in client_etags
+
+
+def _with_etag(response, etag):
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _not_modified(etag):
+    return _with_etag(HttpResponseNotModified(), etag)
+
 # ---------------------------
 # Register (Signup) View
 # ---------------------------
@@ -60,31 +87,18 @@ class LoginView(generics.GenericAPIView):
         user = serializer.validated_data["user"]
         wallet = getattr(user, 'wallet', None)
 
+        today = timezone.now().date()
         if not wallet:
-            wallet = Wallet.objects.create(user=user, boiya_id=f"BOIYA{user.id:06d}")
-            wallet.add_coins(Decimal('50.00'))
-            Transaction.objects.create(
-                wallet=wallet,
-                amount=Decimal('50.00'),
-                transaction_type='SIGNUP_BONUS',
-                status='COMPLETED',
-                description='Welcome bonus'
-            )
-            wallet.last_login_bonus = timezone.now().date()
+            wallet = Wallet.objects.create(user=user, boiya_id=f"BOIYA{user.id:06d}", last_login_bonus=today)
+            ledger.credit(wallet, Decimal('50.00'), 'SIGNUP_BONUS', status='COMPLETED', description='Welcome bonus')
 
-        today = timezone.now().date()
-        is_first_login = wallet.last_login_bonus is None or wallet.last_login_bonus == timezone.now().date()
-        if wallet.last_login_bonus != today and not is_first_login:
-            wallet.add_coins(Decimal('50.00'))
-            wallet.last_login_bonus = today
-            wallet.save()
-            Transaction.objects.create(
-                wallet=wallet,
-                amount=Decimal('50.00'),
-                transaction_type='DAILY_LOGIN',
-                status='COMPLETED',
-                description='Daily login bonus'
-            )
+        is_first_login = wallet.last_login_bonus is None or wallet.last_login_bonus == today
+        if wallet.last_login_bonus is None:
+            # First login: the signup bonus covers today, later days earn the daily bonus
+            Wallet.objects.filter(pk=wallet.pk, last_login_bonus__isnull=True).update(last_login_bonus=today)
+        elif not is_first_login:
+            # One guarded UPDATE: a concurrent login on the same day cannot claim the bonus twice
+            ledger.claim_daily_bonus(wallet, Decimal('50.00'), today)
 
         refresh = RefreshToken.for_user(user)
 
@@ -268,6 +282,7 @@ class SendView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = TransferSerializer
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=False)
@@ -278,11 +293,10 @@ class SendView(generics.GenericAPIView):
             if sender_wallet:
                 amount = serializer.initial_data.get('amount', Decimal('0.00'))
                 recipient_boiya_id = serializer.initial_data.get('recipient_boiya_id', '')
-                Transaction.objects.create(
-                    wallet=sender_wallet,
-                    amount=amount,
-                    transaction_type='TRANSFER_SEND',
-                    status='FAILED',
+                ledger.record_failed(
+                    sender_wallet,
+                    amount,
+                    'TRANSFER_SEND',
                     description=f'Validation failed for Boiya ID {recipient_boiya_id}: {str(serializer.errors)}'
                 )
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -292,48 +306,35 @@ class SendView(generics.GenericAPIView):
         recipient_boiya_id = serializer.initial_data['recipient_boiya_id']
 
         try:
-            recipient_wallet = Wallet.objects.get(boiya_id=recipient_boiya_id)
+            recipient_wallet = Wallet.objects.select_related('user').get(boiya_id=recipient_boiya_id)
             if sender_wallet == recipient_wallet:
-                Transaction.objects.create(
-                    wallet=sender_wallet,
+                ledger.record_failed(
+                    sender_wallet,
+                    amount,
+                    'TRANSFER_SEND',
                     recipient_wallet=recipient_wallet,
-                    amount=amount,
-                    transaction_type='TRANSFER_SEND',
-                    status='FAILED',
                     description=f'Failed transfer to {recipient_wallet.user.username} (self transfer, Boiya ID: {recipient_boiya_id})'
                 )
                 return Response({"detail": "Cannot send coins to yourself."}, status=status.HTTP_400_BAD_REQUEST)
 
-            if not sender_wallet.remove_coins(amount):
-                Transaction.objects.create(
-                    wallet=sender_wallet,
+            try:
+                ledger.transfer(
+                    sender_wallet,
+                    recipient_wallet,
+                    amount,
+                    send_description=f'Transfer to {recipient_wallet.user.username} (Boiya ID: {recipient_boiya_id})',
+                    receive_description=f'Transfer from {request.user.username}'
+                )
+            except ledger.InsufficientBalance:
+                ledger.record_failed(
+                    sender_wallet,
+                    amount,
+                    'TRANSFER_SEND',
                     recipient_wallet=recipient_wallet,
-                    amount=amount,
-                    transaction_type='TRANSFER_SEND',
-                    status='FAILED',
                     description=f'Failed transfer to {recipient_wallet.user.username} (insufficient balance, Boiya ID: {recipient_boiya_id})'
                 )
                 return Response({"detail": "Insufficient balance."}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Transaction successful
-            recipient_wallet.add_coins(amount)
-            Transaction.objects.create(
-                wallet=sender_wallet,
-                recipient_wallet=recipient_wallet,
-                amount=amount,
-                transaction_type='TRANSFER_SEND',
-                status='COMPLETED',
-                description=f'Transfer to {recipient_wallet.user.username} (Boiya ID: {recipient_boiya_id})'
-            )
-            Transaction.objects.create(
-                wallet=recipient_wallet,
-                recipient_wallet=sender_wallet,
-                amount=amount,
-                transaction_type='TRANSFER_RECEIVE',
-                status='COMPLETED',
-                description=f'Transfer from {request.user.username}'
-            )
-
             return Response({
                 "detail": "Sent Successful!",
                 "amount": str(amount),
@@ -342,11 +343,10 @@ class SendView(generics.GenericAPIView):
 
         except Wallet.DoesNotExist:
             # Log failed transaction for invalid recipient
-            Transaction.objects.create(
-                wallet=sender_wallet,
-                amount=amount,
-                transaction_type='TRANSFER_SEND',
-                status='FAILED',
+            ledger.record_failed(
+                sender_wallet,
+                amount,
+                'TRANSFER_SEND',
                 description=f'Failed transfer to Boiya ID {recipient_boiya_id} (invalid recipient)'
             )
             return Response({"detail": "Invalid Recipient Boiya ID."}, status=status.HTTP_400_BAD_REQUEST)
@@ -387,31 +387,51 @@ class GradeListView(generics.ListAPIView):
 # Current Balance View
 # ---------------------------
 class CurrentBalanceView(generics.GenericAPIView):
+    """
+    Current wallet balance, with an ETag on the wallet version for conditional polling.
+    """
     permission_classes = [IsAuthenticated]
     serializer_class = CurrentBalanceSerializer
 
     def get(self, request, *args, **kwargs):
         user = request.user
-        wallet = getattr(user, 'wallet', None)
+        wallet = Wallet.objects.filter(user=user).only('id', 'version', 'balance').first()
         if not wallet:
             wallet = Wallet.objects.create(user=user, boiya_id=f"BOIYA{user.id:06d}")
+        etag = f'"balance-{wallet.id}-{wallet.version}"'
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
         serializer = self.get_serializer(wallet)
-        return Response(serializer.data)
+        return _with_etag(Response(serializer.data), etag)
 
 # ---------------------------
 # Profile View
 # ---------------------------
 class ProfileView(generics.GenericAPIView):
+    """
+    GET: profile with wallet balance, with an ETag on the wallet version and the profile fields.
+    POST: upload a new profile image (JPEG, PNG, WebP or GIF). It is resized and uploaded in the background; the
+    response (202) lists the PENDING upload under 'uploads', and profile_image changes once it is
+    DONE (poll /api/raw/uploads/<id>/).
+    """
     permission_classes = [IsAuthenticated]
     serializer_class = ProfileSerializer
 
     def get(self, request, *args, **kwargs):
         user = request.user
-        wallet = getattr(user, 'wallet', None)
+        wallet = Wallet.objects.filter(user=user).only('id', 'version', 'balance', 'boiya_id').first()
         if not wallet:
             wallet = Wallet.objects.create(user=user, boiya_id=f"BOIYA{user.id:06d}")
+        user.wallet = wallet
+        # The user row was already loaded by authentication; fold the fields shown here into the tag
+        profile = hashlib.sha256(
+            f"{user.username}|{user.profile_image}|{user.is_2fa_enabled}|{user.date_joined}".encode()
+        ).hexdigest()[:16]
+        etag = f'"profile-{wallet.id}-{wallet.version}-{profile}"'
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
         serializer = self.get_serializer(user)
-        return Response(serializer.data)
+        return _with_etag(Response(serializer.data), etag)
 
     def post(self, request, *args, **kwargs):
         user = request.user
@@ -420,19 +440,17 @@ class ProfileView(generics.GenericAPIView):
 
         image_file = request.FILES['profile_image']
         try:
-            # Upload to Cloudinary
-            result = cloudinary.uploader.upload(image_file, folder="user_profiles")
-            image_url = result['secure_url']
-
-            # Update user's profile image
-            user.profile_image = image_url
-            user.save(update_fields=['profile_image'])
-
-            serializer = self.get_serializer(user)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Exception as e:
+            # Stored as 64/256/1024px derivatives; profile_image is the 256px one
+            upload = stage_image(image_file, user, 'profile_image', 'user_profiles', 'profile_image_variants', 256, user=user)
+        except InvalidImage as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except OSError as e:
             return Response({"detail": f"Image upload failed: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
 
+        data = dict(self.get_serializer(user).data)
+        data['uploads'] = MediaUploadSerializer([upload], many=True).data
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
 # ---------------------------
 # 2FA Views
 # ---------------------------
@@ -478,17 +496,21 @@ class TwoFactorAuthValidateView(generics.GenericAPIView):
 class TransactionHistoryView(generics.ListAPIView):
     """
     Retrieve the transaction history for the authenticated user.
-    - GET: Returns a list of transactions.
+    - GET: Returns a page of transactions, newest first, and a 'next' cursor link.
+    - Query params: page_size (max 100), cursor (taken from 'next').
     """
     permission_classes = [IsAuthenticated]
     serializer_class = TransactionHistorySerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         user = self.request.user
         wallet = getattr(user, 'wallet', None)
         if not wallet:
             return Transaction.objects.none()
-        return Transaction.objects.filter(wallet=wallet).order_by('-created_at')
+        return Transaction.objects.filter(wallet=wallet).select_related(
+            'wallet__user', 'recipient_wallet__user'
+        ).order_by('-created_at', '-id')
 
 # ---------------------------
 # Resend OTP Views
@@ -570,16 +592,28 @@ class RecentActivityView(generics.ListAPIView):
     """
     Retrieve the 5 latest transaction activities for the authenticated user.
     - GET: Returns a list of the most recent transactions.
+    - ETag: wallet version plus the current minute, since time_ago moves even without new postings.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = RecentActivitySerializer
 
     def get_queryset(self):
-        user = self.request.user
-        wallet = getattr(user, 'wallet', None)
-        if not wallet:
+        wallet_id = getattr(self, 'wallet_id', None)
+        if not wallet_id:
             return Transaction.objects.none()
-        return Transaction.objects.filter(wallet=wallet).order_by('-created_at')[:5]    
+        return Transaction.objects.filter(wallet_id=wallet_id).select_related(
+            'wallet__user', 'recipient_wallet__user'
+        ).order_by('-created_at', '-id')[:5]
+
+    def list(self, request, *args, **kwargs):
+        state = Wallet.objects.filter(user=request.user).values_list('id', 'version').first()
+        if not state:
+            return super().list(request, *args, **kwargs)
+        self.wallet_id, version = state
+        etag = f'"activity-{self.wallet_id}-{version}-{int(time.time() // 60)}"'
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        return _with_etag(super().list(request, *args, **kwargs), etag)
     
 
 
@@ -161,8 +161,27 @@ USE_TZ = True
 STATIC_URL = "/static/"
 # STATIC_ROOT = BASE_DIR / "static"
 
-# MEDIA_URL = env("MEDIA_URL", default="/media/")
-# MEDIA_ROOT = Path(env("MEDIA_ROOT", default=BASE_DIR / "media"))
+MEDIA_URL = env("MEDIA_URL", default="/media/")
+MEDIA_ROOT = Path(env("MEDIA_ROOT", default=BASE_DIR / "media"))
+# Where uploads go: apps.raw.media.CloudinaryMediaStorage, or apps.raw.media.LocalMediaStorage (MEDIA_ROOT) for development
+MEDIA_STORAGE = env("MEDIA_STORAGE", default="apps.raw.media.CloudinaryMediaStorage")
+# Concurrent uploads per bulk product import
+MEDIA_UPLOAD_WORKERS = env.int("MEDIA_UPLOAD_WORKERS", default=8)
+# Bulk import limits on uncompressed sizes: per media file, and for the whole ZIP
+IMPORT_MAX_MEDIA_SIZE = env.int("IMPORT_MAX_MEDIA_SIZE_MB", default=50) * 1024 * 1024
+IMPORT_MAX_ARCHIVE_SIZE = env.int("IMPORT_MAX_ARCHIVE_SIZE_MB", default=500) * 1024 * 1024
+# Request uploads are staged here and pushed to MEDIA_STORAGE in the background (see apps/raw/media.py);
+# must be shared with the process_media_uploads command if it runs on another host
+MEDIA_STAGING_ROOT = Path(env("MEDIA_STAGING_ROOT", default=BASE_DIR / "media_staging"))
+# Upload threads per web process; set MEDIA_UPLOAD_IN_PROCESS=False to leave every upload to process_media_uploads.
+# Deploy requirement either way: schedule `manage.py process_media_uploads` every minute (or run it with --loop);
+# it is what recovers uploads queued in a restarted worker or claimed by one that died
+MEDIA_UPLOAD_IN_PROCESS = env.bool("MEDIA_UPLOAD_IN_PROCESS", default=True)
+MEDIA_BACKGROUND_WORKERS = env.int("MEDIA_BACKGROUND_WORKERS", default=2)
+# Uploaded pictures (see apps/raw/images.py): limits checked in the request, and the derivatives' encoding (WEBP or JPEG)
+MAX_IMAGE_UPLOAD_SIZE = env.int("MAX_IMAGE_UPLOAD_SIZE_MB", default=20) * 1024 * 1024
+MAX_IMAGE_PIXELS = env.int("MAX_IMAGE_PIXELS", default=50_000_000)
+IMAGE_DERIVATIVE_FORMAT = env("IMAGE_DERIVATIVE_FORMAT", default="WEBP")
 
 # -----------------------
 # REST FRAMEWORK
@@ -176,6 +195,33 @@ REST_FRAMEWORK = {
     ],
 }
 
+# -----------------------
+# IDEMPOTENCY KEYS
+# -----------------------
+# How long a stored response is replayed for a repeated Idempotency-Key header
+IDEMPOTENCY_KEY_TTL = timedelta(hours=env.int("IDEMPOTENCY_KEY_TTL_HOURS", default=24))
+
+# -----------------------
+# CACHE
+# -----------------------
+# Per-process memory by default, for development and tests; point CACHE_URL at a shared backend
+# (memcached, redis) in production, which manage.py check --deploy enforces (admin_api.E001)
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+# With the per-process cache, catalog / analytics generations expire after this many seconds,
+# bounding how long a worker that missed a bump serves stale data
+LOCAL_GENERATION_TIMEOUT = env.int("LOCAL_GENERATION_TIMEOUT", default=30)
+# Upper bound on how long an analytics response is served from the cache (generation bumps invalidate sooner)
+ANALYTICS_CACHE_TIMEOUT = env.int("ANALYTICS_CACHE_TIMEOUT", default=300)
+
+# -----------------------
+# SALES COUNTERS
+# -----------------------
+# Counter slots per product; raise it if purchases of one product still queue on the same slot
+PRODUCT_SALES_SHARDS = env.int("PRODUCT_SALES_SHARDS", default=16)
+# Slots per daily stats group (day, type, status, category), so concurrent postings of one type
+# do not all queue on today's row
+DAILY_STATS_SHARDS = env.int("DAILY_STATS_SHARDS", default=8)
+
 # -----------------------
 # SIMPLE JWT
 # -----------------------
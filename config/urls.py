@@ -1,4 +1,6 @@
 # boiya_digital_wallet/urls.py
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenRefreshView
@@ -10,4 +12,4 @@ urlpatterns = [
     path('api/admin-api/', include('apps.admin_api.urls')),
     path('shop/', include('apps.shop.urls')),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-]
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)  # LocalMediaStorage files, DEBUG only